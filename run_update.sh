@@ -1,8 +1,8 @@
 #!/bin/bash
-# script para que el scheduler invoque al agente de smart-frame correctamente
+# Starts the smart-frame update daemon (scripts/daemon.py) if it is not running.
+# Safe to call from the scheduler every few minutes: while one instance holds
+# the lock, a new one exits immediately. Pass --once for a single update cycle.
 
-/opt/homebrew/bin/openclaw agent \
-  --to +50660048606 \
-  --message "Actualiza el Dashboard del smart-frame (Weather, IG, News) y súbelo al FTP y Git. Sigue las instrucciones en INSTRUCTIONS_FRAME.md" \
-  --thinking low \
-  --deliver
+cd "$(dirname "$0")" || exit 1
+mkdir -p .cache
+exec python3 scripts/daemon.py "$@" >> .cache/daemon.log 2>&1
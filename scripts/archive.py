@@ -0,0 +1,122 @@
+import hashlib
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from state_store import get_store
+
+# Archive of delivered frames, kept out of the published (git) tree.
+# Frames are stored content-addressed (objects/ab/<sha256>.<ext>), so a frame
+# identical to an earlier one costs one index row and no extra bytes. The
+# timestamp index lives in the state store; prune() thins it with the
+# retention tiers below and deletes objects nothing points at any more.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE_DIR = os.environ.get("SMART_FRAME_ARCHIVE_DIR", os.path.join(PROJECT_DIR, "archive"))
+
+# (max age in seconds, bucket in seconds), youngest first. Within a tier one
+# frame per bucket is kept (the first one); None keeps every frame.
+RETENTION: Tuple[Tuple[Optional[float], Optional[float]], ...] = (
+    (48 * 3600, None),           # every frame for 48 h
+    (30 * 86400, 3600),          # hourly for 30 days
+    (None, 86400),               # daily after that
+)
+
+LEGACY_NAME = re.compile(r"Dashboard_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2})\.(png|jpg|webp)$")
+
+
+def object_path(digest: str, ext: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, "objects", digest[:2], f"{digest}.{ext}")
+
+
+def archive_frame(data: bytes, ext: str, ts: Optional[float] = None, archive_dir: str = ARCHIVE_DIR) -> Dict[str, Any]:
+    # Returns {"digest", "path", "new"}; "new" is False when the bytes were already stored
+    digest = hashlib.sha256(data).hexdigest()
+    path = object_path(digest, ext, archive_dir)
+    new = not os.path.exists(path)
+    if new:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    get_store().add_frame(ts or time.time(), digest, ext, len(data))
+    return {"digest": digest, "path": path, "new": new}
+
+
+def _expired(rows, now: float) -> List[int]:
+    # Index rows to drop under RETENTION
+    drop: List[int] = []
+    seen = set()
+    for row_id, ts, *_ in rows:
+        age = now - ts
+        for tier, (max_age, bucket) in enumerate(RETENTION):
+            if max_age is None or age < max_age:
+                break
+        if bucket is None:
+            continue
+        key = (tier, int(ts // bucket))
+        if key in seen:
+            drop.append(row_id)
+        else:
+            seen.add(key)
+    return drop
+
+
+def prune(now: Optional[float] = None, archive_dir: str = ARCHIVE_DIR) -> Dict[str, int]:
+    now = now or time.time()
+    store = get_store()
+    drop = _expired(store.frames(), now)
+    removed = 0
+    for digest, ext in store.delete_frames(drop) if drop else []:
+        try:
+            os.remove(object_path(digest, ext, archive_dir))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return {"rows": len(drop), "objects": removed}
+
+
+def import_files(paths, remove: bool = False, archive_dir: str = ARCHIVE_DIR) -> int:
+    # Imports the old Dashboard_YYYY-MM-DD_HH-MM.png frames from the repo root
+    count = 0
+    for path in sorted(paths):
+        m = LEGACY_NAME.search(os.path.basename(path))
+        if not m:
+            continue
+        ts = datetime.strptime(m.group(1), "%Y-%m-%d_%H-%M").timestamp()
+        with open(path, "rb") as f:
+            archive_frame(f.read(), m.group(2), ts=ts, archive_dir=archive_dir)
+        if remove:
+            os.remove(path)
+        count += 1
+    return count
+
+
+def find(ts: float) -> Optional[str]:
+    # Path of the newest archived frame at or before ts
+    rows = get_store().frames(until=ts)
+    return object_path(rows[-1][2], rows[-1][3]) if rows else None
+
+
+if __name__ == "__main__":
+    import glob
+    import sys
+
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if cmd == "import":
+        remove = "--remove" in sys.argv
+        n = import_files(glob.glob(os.path.join(PROJECT_DIR, "Dashboard_20*.*")), remove=remove)
+        print(f"Imported {n} frames into {ARCHIVE_DIR}")
+    elif cmd == "prune":
+        print(prune())
+    elif cmd == "find" and len(sys.argv) > 2:
+        print(find(datetime.strptime(sys.argv[2], "%Y-%m-%d_%H-%M").timestamp()) or "no frame")
+    elif cmd == "stats":
+        rows = get_store().frames()
+        digests = {r[2]: r[4] for r in rows}
+        print(f"{len(rows)} frames, {len(digests)} objects, {sum(digests.values()) / 1e6:.1f} MB")
+    else:
+        print("usage: archive.py [stats | import [--remove] | prune | find YYYY-MM-DD_HH-MM]")
@@ -0,0 +1,179 @@
+import json
+import math
+import os
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+# Offline sun and moon table for the frame's location.
+# Dawn / sunrise / sunset / dusk (civil twilight) and the moon's elongation
+# are computed once per day for a year ahead (NOAA solar equations, Meeus
+# lunar phase terms) and kept in .cache/astronomy.json. Lookups index the
+# table by day number, so the day/night theme and the moon icon resolve
+# locally even when the weather API is slow or unreachable.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASTRONOMY_FILE = os.path.join(PROJECT_DIR, ".cache", "astronomy.json")
+TABLE_VERSION = 2
+TABLE_DAYS = 366
+
+LATITUDE = 10.0163
+LONGITUDE = -84.2116
+TIMEZONE = "America/Costa_Rica"
+
+SUNRISE_ZENITH = 90.833  # refraction + solar disc
+CIVIL_ZENITH = 96.0
+
+MOON_ICONS = ["🌑", "🌒", "🌓", "🌔", "🌕", "🌖", "🌗", "🌘"]
+
+
+def _julian_day(t: datetime) -> float:
+    return t.timestamp() / 86400.0 + 2440587.5
+
+
+def _sun_times(day: date, lat: float, lon: float) -> Dict[str, Any]:
+    # Minutes after 00:00 UTC of `day` for each event (NOAA algorithm); None when
+    # the sun never reaches that zenith
+    jd = _julian_day(datetime.combine(day, time(12), timezone.utc))
+    t = (jd - 2451545.0) / 36525.0
+    l0 = (280.46646 + t * (36000.76983 + 0.0003032 * t)) % 360
+    m = math.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+    e = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    c = (math.sin(m) * (1.914602 - t * (0.004817 + 0.000014 * t))
+         + math.sin(2 * m) * (0.019993 - 0.000101 * t) + math.sin(3 * m) * 0.000289)
+    omega = math.radians(125.04 - 1934.136 * t)
+    apparent = math.radians(l0 + c - 0.00569 - 0.00478 * math.sin(omega))
+    obliquity = math.radians(23 + (26 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60) / 60
+                             + 0.00256 * math.cos(omega))
+    decl = math.asin(math.sin(obliquity) * math.sin(apparent))
+    y = math.tan(obliquity / 2) ** 2
+    l0r = math.radians(l0)
+    eq_time = 4 * math.degrees(y * math.sin(2 * l0r) - 2 * e * math.sin(m) + 4 * e * y * math.sin(m) * math.cos(2 * l0r)
+                               - 0.5 * y * y * math.sin(4 * l0r) - 1.25 * e * e * math.sin(2 * m))
+    noon = 720 - 4 * lon - eq_time
+    phi = math.radians(lat)
+
+    def _cos_hour_angle(zenith: float) -> float:
+        return (math.cos(math.radians(zenith)) - math.sin(phi) * math.sin(decl)) / (math.cos(phi) * math.cos(decl))
+
+    out: Dict[str, Optional[float]] = {"noon": noon}
+    for rise, sset, zenith in (("dawn", "dusk", CIVIL_ZENITH), ("sunrise", "sunset", SUNRISE_ZENITH)):
+        cos_h = _cos_hour_angle(zenith)
+        h = None if abs(cos_h) > 1 else math.degrees(math.acos(cos_h))
+        out[rise] = None if h is None else noon - 4 * h
+        out[sset] = None if h is None else noon + 4 * h
+    # Below -1 the sun never sets (polar day), above 1 it never rises
+    out["polar_day"] = _cos_hour_angle(SUNRISE_ZENITH) < -1
+    return out
+
+
+def moon_elongation(t: datetime) -> float:
+    # Moon - Sun elongation in degrees, 0 = new, 180 = full (Meeus 48.4)
+    T = (_julian_day(t) - 2451545.0) / 36525.0
+    d = math.radians((297.8501921 + 445267.1114034 * T - 0.0018819 * T * T) % 360)
+    m = math.radians((357.5291092 + 35999.0502909 * T - 0.0001536 * T * T) % 360)
+    mp = math.radians((134.9633964 + 477198.8675055 * T + 0.0087414 * T * T) % 360)
+    phase_angle = (180 - math.degrees(d) - 6.289 * math.sin(mp) + 2.100 * math.sin(m) - 1.274 * math.sin(2 * d - mp)
+                   - 0.658 * math.sin(2 * d) - 0.214 * math.sin(2 * mp) - 0.110 * math.sin(d))
+    return (180 - phase_angle) % 360
+
+
+def build_table(start: date, days: int = TABLE_DAYS, lat: float = LATITUDE, lon: float = LONGITUDE,
+                tz: str = TIMEZONE) -> Dict[str, Any]:
+    # One row per local day: dawn, sunrise, sunset, dusk as Unix timestamps
+    # (None in polar day/night) and the elongation at local midnight
+    zone = ZoneInfo(tz)
+    rows = []
+    for i in range(days + 1):
+        day = start + timedelta(days=i)
+        midnight_utc = datetime.combine(day, time(0), timezone.utc)
+        events = _sun_times(day, lat, lon)
+        row: Dict[str, Any] = {}
+        for name in ("dawn", "sunrise", "sunset", "dusk"):
+            minutes = events[name]
+            row[name] = None if minutes is None else round((midnight_utc + timedelta(minutes=minutes)).timestamp())
+        row["polar_day"] = events["polar_day"]
+        row["moon"] = round(moon_elongation(datetime.combine(day, time(0), zone)), 3)
+        rows.append(row)
+    return {"version": TABLE_VERSION, "lat": lat, "lon": lon, "tz": tz, "start": start.isoformat(), "rows": rows}
+
+
+_TABLE: Optional[Dict[str, Any]] = None
+_lock = threading.Lock()
+
+
+def _valid(table: Optional[Dict[str, Any]], day: date, lat: float, lon: float, tz: str) -> bool:
+    if not table or table.get("version") != TABLE_VERSION or (table["lat"], table["lon"], table["tz"]) != (lat, lon, tz):
+        return False
+    offset = (day - date.fromisoformat(table["start"])).days
+    # Needs today and tomorrow (moon interpolation)
+    return 0 <= offset < len(table["rows"]) - 1
+
+
+def get_table(day: Optional[date] = None, lat: float = LATITUDE, lon: float = LONGITUDE,
+              tz: str = TIMEZONE, path: str = ASTRONOMY_FILE) -> Dict[str, Any]:
+    # Loaded once per process; regenerated when it no longer covers `day`
+    global _TABLE
+    day = day or datetime.now(ZoneInfo(tz)).date()
+    with _lock:
+        if _valid(_TABLE, day, lat, lon, tz):
+            return _TABLE  # type: ignore
+        try:
+            with open(path, "r") as f:
+                _TABLE = json.load(f)
+        except (OSError, ValueError):
+            _TABLE = None
+        if not _valid(_TABLE, day, lat, lon, tz):
+            _TABLE = build_table(day, lat=lat, lon=lon, tz=tz)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(_TABLE, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        return _TABLE  # type: ignore
+
+
+def _local(now: datetime, tz: str) -> datetime:
+    # Naive datetimes are local wall-clock time at the frame's location
+    return now.replace(tzinfo=ZoneInfo(tz)) if now.tzinfo is None else now.astimezone(ZoneInfo(tz))
+
+
+def sky(now: datetime, tz: str = TIMEZONE) -> Dict[str, Any]:
+    # {"dawn", "sunrise", "sunset", "dusk"} as local datetimes, "is_day",
+    # "twilight", "moon_phase" (0 new .. 0.5 full .. 1) and "moon_icon"
+    now = _local(now, tz)
+    table = get_table(now.date(), tz=tz)
+    i = (now.date() - date.fromisoformat(table["start"])).days
+    today, tomorrow = table["rows"][i], table["rows"][i + 1]
+    ts = now.timestamp()
+
+    out: Dict[str, Any] = {}
+    for name in ("dawn", "sunrise", "sunset", "dusk"):
+        out[name] = None if today[name] is None else datetime.fromtimestamp(today[name], ZoneInfo(tz))
+    if today["sunrise"] is None:
+        out["is_day"] = bool(today["polar_day"])
+    else:
+        out["is_day"] = today["sunrise"] <= ts < today["sunset"]
+    out["twilight"] = (not out["is_day"] and today["dawn"] is not None and today["sunrise"] is not None
+                       and (today["dawn"] <= ts < today["sunrise"] or today["sunset"] <= ts < today["dusk"]))
+
+    # Elongation grows ~12.2 degrees a day; interpolate across the day
+    midnight = datetime.combine(now.date(), time(0), ZoneInfo(tz)).timestamp()
+    span = (tomorrow["moon"] - today["moon"]) % 360
+    phase = ((today["moon"] + span * (ts - midnight) / 86400.0) % 360) / 360.0
+    out["moon_phase"] = phase
+    out["moon_icon"] = MOON_ICONS[int((phase * 8 + 0.5) % 8)]
+    return out
+
+
+if __name__ == "__main__":
+    import sys
+
+    when = datetime.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else datetime.now()
+    s = sky(when)
+    fmt = lambda t: t.strftime("%H:%M") if t else "--:--"
+    print(f"{when:%Y-%m-%d %H:%M} dawn {fmt(s['dawn'])} sunrise {fmt(s['sunrise'])} "
+          f"sunset {fmt(s['sunset'])} dusk {fmt(s['dusk'])} "
+          f"{'day' if s['is_day'] else 'twilight' if s['twilight'] else 'night'} "
+          f"moon {s['moon_phase']:.3f} {s['moon_icon']}")
@@ -0,0 +1,482 @@
+import argparse
+import contextlib
+import functools
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+# End-to-end cycle benchmark.
+# Runs update_data() + save_data() + generate_and_upload() (and optionally
+# sync_strict()) against local stand-ins: a mock Open-Meteo server, a mock
+# image host, a bare git remote and a pyftpdlib FTP server, all in a temp
+# directory. Each stage is timed (wall + process CPU) and its bytes counted
+# over N iterations; the summary is written as JSON and checked against
+# regression thresholds.
+#
+#   python3 scripts/benchmark.py -n 10 --out bench.json
+#   python3 scripts/benchmark.py --baseline bench.json --tolerance 0.25
+#
+# CPU time is process-wide, so it includes helper threads running at the same time.
+# With --cached, the weather cache runs with the daemon's TTL and its clock
+# moves one DAEMON_CYCLE between iterations, and the run checks that a weather history
+# reading is still stored for every forecast downloaded.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_FILES = ("index.html", "bundle.json", "maxx_avatar_real.png")
+SEED_DIRS = ("images",)
+DAEMON_TTL = 600      # daemon.serve() caps WEATHER_CACHE_TTL at the weather interval
+DAEMON_CYCLE = 620    # seconds between cycles in --cached runs
+
+# Absolute limits (p50 wall ms per stage); --thresholds FILE overrides them
+THRESHOLDS: Dict[str, Dict[str, float]] = {
+    "fetch": {"wall_ms_p50": 500},
+    "save": {"wall_ms_p50": 100},
+    "images": {"wall_ms_p50": 500},
+    "render": {"wall_ms_p50": 1500},
+    "encode": {"wall_ms_p50": 2500},
+    "archive": {"wall_ms_p50": 200},
+    "ftp": {"wall_ms_p50": 1000},
+    "deliver": {"wall_ms_p50": 5000},
+    "publish": {"wall_ms_p50": 5000},
+}
+
+
+# --- Local stand-ins ---
+
+def mock_forecast(now: datetime, shift: float = 0.0, days: int = 3) -> Dict[str, Any]:
+    # Open-Meteo shaped payload from today on; shift changes the temperatures per iteration
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    hours = [day + timedelta(hours=h) for h in range(24 * days)]
+    temps = [round(25 - abs(13 - h % 24) * 0.6 + shift, 1) for h in range(24 * days)]
+    codes = [61 if 14 <= h % 24 < 17 else 1 for h in range(24 * days)]
+    dates = [day + timedelta(days=d) for d in range(days)]
+    return {
+        "current": {"time": now.strftime("%Y-%m-%dT%H:%M"), "temperature_2m": temps[now.hour],
+                    "wind_speed_10m": 7.2, "weather_code": codes[now.hour]},
+        "hourly": {
+            "time": [h.strftime("%Y-%m-%dT%H:%M") for h in hours],
+            "temperature_2m": temps,
+            "weather_code": codes,
+            "apparent_temperature": [t + 1 for t in temps],
+            "relative_humidity_2m": [80] * len(hours),
+            "wind_speed_10m": [7.2] * len(hours),
+            "precipitation_probability": [70 if c == 61 else 10 for c in codes],
+        },
+        "daily": {
+            "time": [d.strftime("%Y-%m-%d") for d in dates],
+            "weather_code": [61] * days,
+            "temperature_2m_max": [max(temps[:24])] * days, "temperature_2m_min": [min(temps[:24])] * days,
+            "uv_index_max": [9.1] * days, "precipitation_probability_max": [70] * days,
+            "sunrise": [d.strftime("%Y-%m-%dT05:41") for d in dates],
+            "sunset": [d.strftime("%Y-%m-%dT17:53") for d in dates],
+        },
+    }
+
+
+class MockWeatherAPI:
+    def __init__(self):
+        self.shift = 0.0
+        self.bytes_sent = 0
+        self.requests = 0
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(mock_forecast(datetime.now(), api.shift)).encode("utf-8")
+                api.requests += 1
+                api.bytes_sent += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="mock-weather", daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/forecast?latitude=10.0163&longitude=-84.2116"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class DaemonClock:
+    # Stands in for the time module in http_cache; advance() moves its clock
+    # one daemon cycle ahead, so cached responses age as they would under serve()
+    def __init__(self):
+        self.offset = 0.0
+
+    def advance(self, seconds: float):
+        self.offset += seconds
+
+    def time(self) -> float:
+        return time.time() + self.offset
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class MockImages:
+    # Stands in for fetch.CLIENT in image_cache: every URL is the same large
+    # photo, with an ETag so revalidations answer 304
+    def __init__(self, size=(1600, 900)):
+        import io
+
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.linear_gradient("L").resize(size).convert("RGB").save(buf, format="JPEG", quality=95)
+        self.body = buf.getvalue()
+        self.etag = f'"{len(self.body)}"'
+        self.bytes_sent = 0
+
+    def request(self, url, headers=None, timeout=None):
+        if (headers or {}).get("If-None-Match") == self.etag:
+            return 304, {"etag": self.etag}, b""
+        self.bytes_sent += len(self.body)
+        return 200, {"etag": self.etag}, self.body
+
+    def take_bytes(self) -> int:
+        sent, self.bytes_sent = self.bytes_sent, 0
+        return sent
+
+
+class LocalFTP:
+    def __init__(self, root: str):
+        try:
+            from pyftpdlib.authorizers import DummyAuthorizer
+            from pyftpdlib.handlers import FTPHandler
+            from pyftpdlib.log import config_logging
+            from pyftpdlib.servers import ThreadedFTPServer
+        except ImportError:
+            raise SystemExit("benchmark.py needs pyftpdlib for the local FTP server (pip install pyftpdlib)")
+        config_logging(level=logging.WARNING)
+        authorizer = DummyAuthorizer()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # anonymous write access is the point here
+            authorizer.add_anonymous(root, perm="elradfmwMT")
+        handler = type("BenchFTPHandler", (FTPHandler,), {"authorizer": authorizer, "log_prefix": ""})
+        self.root = root
+        self.server = ThreadedFTPServer(("127.0.0.1", 0), handler)
+        self.port = self.server.socket.getsockname()[1]
+        threading.Thread(target=self.server.serve_forever, kwargs={"handle_exit": False},
+                         name="local-ftp", daemon=True).start()
+
+    def close(self):
+        self.server.close_all()
+
+
+def make_project(root: str) -> str:
+    # Copy of the published files in a git repo with a local bare remote
+    work = os.path.join(root, "project")
+    remote = os.path.join(root, "remote.git")
+    os.makedirs(work)
+    for name in SEED_FILES:
+        if os.path.exists(os.path.join(PROJECT_DIR, name)):
+            shutil.copy2(os.path.join(PROJECT_DIR, name), work)
+    for name in SEED_DIRS:
+        shutil.copytree(os.path.join(PROJECT_DIR, name), os.path.join(work, name))
+    quiet = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    subprocess.check_call(["git", "init", "--bare", "-q", remote], **quiet)
+    git = ["git", "-C", work, "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+    subprocess.check_call(["git", "init", "-q", work], **quiet)
+    subprocess.check_call(git + ["add", "."], **quiet)
+    subprocess.check_call(git + ["commit", "-qm", "seed"], **quiet)
+    subprocess.check_call(git + ["remote", "add", "origin", remote], **quiet)
+    subprocess.check_call(git + ["push", "-q", "-u", "origin", "HEAD"], **quiet)
+    subprocess.check_call(["git", "-C", work, "config", "user.name", "bench"])
+    subprocess.check_call(["git", "-C", work, "config", "user.email", "bench@localhost"])
+    return work
+
+
+@contextlib.contextmanager
+def quiet_output():
+    # Silences the pipeline's prints and its git subprocesses (fds 1 and 2)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+        os.dup2(devnull.fileno(), 2)
+        try:
+            with contextlib.redirect_stdout(devnull):
+                yield
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, copy in enumerate(saved, start=1):
+                os.dup2(copy, fd)
+                os.close(copy)
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for base, _, files in os.walk(path):
+        for name in files:
+            with contextlib.suppress(OSError):
+                total += os.path.getsize(os.path.join(base, name))
+    return total
+
+
+# --- Stage recording ---
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[Dict[str, float]]] = {}
+        self._bytes: Dict[str, int] = {}
+        self._totals: Dict[str, Dict[str, float]] = {}
+
+    def add_bytes(self, stage: str, n: int):
+        self._bytes[stage] = self._bytes.get(stage, 0) + n
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(name, []).append({
+                "wall_ms": (time.perf_counter() - wall) * 1000,
+                "cpu_ms": (time.process_time() - cpu) * 1000,
+                "bytes": self._bytes.pop(name, 0),
+            })
+
+    def wrap(self, name: str, fn: Callable, count: Optional[Callable[[Any, tuple], int]] = None,
+             per_call: bool = True) -> Callable:
+        # per_call=False sums every call into one sample per flush() (e.g. FTP ops per cycle)
+        @functools.wraps(fn)
+        def _wrapped(*args, **kwargs):
+            with self.stage(name):
+                result = fn(*args, **kwargs)
+                if count:
+                    self.add_bytes(name, count(result, args))
+            if not per_call:
+                sample = self.samples[name].pop()
+                total = self._totals.setdefault(name, {"wall_ms": 0.0, "cpu_ms": 0.0, "bytes": 0})
+                for key, value in sample.items():
+                    total[key] += value
+            return result
+        return _wrapped
+
+    def flush(self):
+        for name, total in self._totals.items():
+            self.samples.setdefault(name, []).append(total)
+        self._totals = {}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for name, rows in self.samples.items():
+            walls = sorted(r["wall_ms"] for r in rows)
+            out[name] = {
+                "n": len(rows),
+                "wall_ms_mean": sum(walls) / len(walls),
+                "wall_ms_p50": _percentile(walls, 50),
+                "wall_ms_p95": _percentile(walls, 95),
+                "wall_ms_max": walls[-1],
+                "cpu_ms_mean": sum(r["cpu_ms"] for r in rows) / len(rows),
+                "bytes_mean": sum(r["bytes"] for r in rows) / len(rows),
+            }
+        return out
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def check(summary: Dict[str, Dict[str, float]], thresholds: Dict[str, Dict[str, float]],
+          baseline: Optional[Dict[str, Dict[str, float]]] = None, tolerance: float = 0.25) -> List[str]:
+    # Returns the list of regressions (empty = pass)
+    failures = []
+    for stage, limits in thresholds.items():
+        for metric, limit in limits.items():
+            value = summary.get(stage, {}).get(metric)
+            if value is not None and value > limit:
+                failures.append(f"{stage}.{metric} = {value:.1f} > limit {limit:.1f}")
+    for stage, metrics in (baseline or {}).items():
+        for metric in ("wall_ms_p50", "bytes_mean"):
+            base, value = metrics.get(metric), summary.get(stage, {}).get(metric)
+            # Ignore sub-5 ms stages: noise dominates
+            if base and value is not None and value > base * (1 + tolerance) and value - base > 5:
+                failures.append(f"{stage}.{metric} = {value:.1f} > baseline {base:.1f} (+{tolerance:.0%})")
+    return failures
+
+
+# --- Harness ---
+
+def run(iterations: int = 5, strict: bool = False, cached: bool = False, verbose: bool = False) -> Dict[str, Any]:
+    root = tempfile.mkdtemp(prefix="smart-frame-bench-")
+    saved_env = dict(os.environ)
+    # Bench spans and metrics stay out of the real .cache/trace.jsonl and .prom
+    os.environ["SMART_FRAME_TRACE_FILE"] = os.path.join(root, "trace.jsonl")
+    os.environ["SMART_FRAME_METRICS_FILE"] = os.path.join(root, "smart_frame.prom")
+    os.environ["SMART_FRAME_ARCHIVE_DIR"] = os.path.join(root, "archive")
+    os.environ["SMART_FRAME_SKIP_POLICY"] = "always"
+    os.environ.setdefault("SMART_FRAME_RENDER_MODE", "native")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    work = make_project(root)
+    api = MockWeatherAPI()
+    ftp_root = os.path.join(root, "ftp")
+    os.makedirs(ftp_root)
+    ftp_server = LocalFTP(ftp_root)
+    devices_file = os.path.join(root, "devices.json")
+    with open(devices_file, "w") as f:
+        json.dump({"devices": [{"name": "bench", "host": "127.0.0.1", "port": ftp_server.port,
+                                "files": ["Dashboard_Latest", "Dashboard_Latest_Copy"]}]}, f)
+    os.environ["SMART_FRAME_DEVICES"] = devices_file
+
+    import devices
+    import ftp_client
+    import http_cache
+    import image_cache
+    import render
+    import tracing
+    import update
+    from data_branch import DataBranch
+    from publisher import Publisher
+    from state_store import get_store
+
+    # Point the pipeline at the stand-ins
+    update.PROJECT_DIR = work
+    update.BUNDLE_FILE = os.path.join(work, "bundle.json")
+    update.STATE_DB = os.path.join(work, "state.db")
+    update.WEATHER_API_URL = api.url
+    http_cache.CACHE_DIR = os.path.join(root, "http-cache")
+    render.TILE_CACHE_DIR = os.path.join(root, "tiles")
+    # Also when tracing was imported before run() set the environment
+    saved_tracing = tracing.TRACE_FILE, tracing.METRICS_FILE
+    tracing.TRACE_FILE = os.environ["SMART_FRAME_TRACE_FILE"]
+    tracing.METRICS_FILE = os.environ["SMART_FRAME_METRICS_FILE"]
+    image_cache.IMAGE_CACHE_DIR = os.path.join(work, image_cache.CACHE_SUBDIR)
+    image_cache.CLIENT = images = MockImages()
+    clock = DaemonClock()
+    if cached:
+        update.WEATHER_CACHE_TTL = DAEMON_TTL
+        http_cache.time = clock
+    else:
+        update.WEATHER_CACHE_TTL = update.WEATHER_CACHE_SWR = 0
+
+    rec = Recorder()
+    update.update_data = rec.wrap("fetch", update.update_data)
+    update.save_data = rec.wrap("save", update.save_data,
+                                lambda _, a: os.path.getsize(update.BUNDLE_FILE))
+    render.render_frame = rec.wrap("render", render.render_frame)
+    update.localize = rec.wrap("images", update.localize, lambda r, _: images.take_bytes())
+    devices.encode_frame = rec.wrap("encode", devices.encode_frame, lambda r, _: r["size"])
+    update.archive_frame = rec.wrap("archive", update.archive_frame, lambda r, _: os.path.getsize(r["path"]) if r["new"] else 0)
+    ftp_client.FrameFTP.upload = rec.wrap("ftp", ftp_client.FrameFTP.upload, lambda n, _: n, per_call=False)
+    for op in ("list", "rename", "delete"):
+        setattr(ftp_client.FrameFTP, op, rec.wrap("ftp", getattr(ftp_client.FrameFTP, op), per_call=False))
+    remote = os.path.join(root, "remote.git")
+    if strict:
+        import sync_strict
+        sync_strict.LATEST_PNG = os.path.join(work, "Dashboard_Latest.png")
+        sync_strict.STATE_DB = update.STATE_DB
+    update.DATA_BRANCH = DataBranch(work)
+    update.PUBLISHER = Publisher(rec.wrap("publish", update.sync_github), name="bench-publish")
+
+    out = contextlib.nullcontext() if verbose else quiet_output()
+    delivered = 0
+    try:
+        with out:
+            for i in range(iterations):
+                api.shift = i * 0.5
+                fetched = api.bytes_sent
+                bundle = update.update_data(write=False)
+                rec.samples["fetch"][-1]["bytes"] = api.bytes_sent - fetched
+                update.save_data(bundle)
+                with rec.stage("deliver"):
+                    delivered += bool(update.generate_and_upload(bundle))
+                before = dir_size(remote)
+                update.PUBLISHER.wait()
+                if rec.samples.get("publish"):
+                    rec.samples["publish"][-1]["bytes"] = dir_size(remote) - before
+                if strict:
+                    with rec.stage("sync_strict"):
+                        sync_strict.sync_strict()
+                rec.flush()
+                if cached:
+                    # The background refresh lands well within a daemon cycle
+                    http_cache.wait_for_revalidation()
+                    clock.advance(DAEMON_CYCLE)
+            devices.close_device_sessions()
+            http_cache.wait_for_revalidation()
+            weather_readings = get_store(update.STATE_DB).history("weather", "temp_c")
+    finally:
+        api.close()
+        ftp_server.close()
+        shutil.rmtree(root, ignore_errors=True)
+        tracing.TRACE_FILE, tracing.METRICS_FILE = saved_tracing
+        http_cache.time = time
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "iterations": iterations,
+        "delivered": delivered,
+        "render_mode": update.RENDER_MODE,
+        "cached": cached,
+        "weather_readings": len(weather_readings),
+        "stages": rec.summary(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark one update cycle per stage against local stand-ins.")
+    parser.add_argument("-n", "--iterations", type=int, default=5)
+    parser.add_argument("--out", help="write the JSON result here (default: stdout)")
+    parser.add_argument("--thresholds", help="JSON file {stage: {metric: limit}} replacing the built-in limits")
+    parser.add_argument("--baseline", help="earlier result JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs the baseline")
+    parser.add_argument("--strict", action="store_true", help="also run sync_strict() each iteration")
+    parser.add_argument("--cached", action="store_true", help="keep the weather HTTP cache on (default: always fetch)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the pipeline's own output")
+    args = parser.parse_args()
+
+    result = run(args.iterations, strict=args.strict, cached=args.cached, verbose=args.verbose)
+    thresholds = THRESHOLDS
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["stages"]
+    result["regressions"] = check(result["stages"], thresholds, baseline, args.tolerance)
+    # One reading per downloaded forecast: every cycle uncached; with --cached the
+    # second cycle still shows the first forecast while its refresh runs
+    expected = max(1, args.iterations - 1) if args.cached else args.iterations
+    if result["weather_readings"] < expected:
+        result["regressions"].append(f"weather history = {result['weather_readings']} readings < {expected}")
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for stage, s in result["stages"].items():
+        print(f"{stage:12s} p50 {s['wall_ms_p50']:8.1f} ms  p95 {s['wall_ms_p95']:8.1f} ms  "
+              f"cpu {s['cpu_ms_mean']:7.1f} ms  {s['bytes_mean'] / 1024:8.1f} KB", file=sys.stderr)
+    for failure in result["regressions"]:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    sys.exit(1 if result["regressions"] else 0)
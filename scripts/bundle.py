@@ -0,0 +1,81 @@
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+# Single data bundle for the dashboard.
+# Replaces the five data.json / weather.json / instagram.json / news.json /
+# moltbot.json files with one versioned, compact document that index.html
+# loads in one request. Every write is temp-file-then-rename, so a reader
+# sees either the previous bundle or the new one, never a partial file.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLE_FILE = os.path.join(PROJECT_DIR, "bundle.json")
+BUNDLE_VERSION = 1
+
+# Section name -> legacy file, in update_data() tuple order
+SECTIONS = (
+    ("data", "data.json"),
+    ("weather", "weather.json"),
+    ("instagram", "instagram.json"),
+    ("news", "news.json"),
+    ("moltbot", "moltbot.json"),
+)
+
+
+def atomic_write_json(path: str, obj: Any, indent: Optional[int] = None):
+    separators = None if indent else (",", ":")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=indent, separators=separators, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def make_bundle(bundle: Tuple[Dict[str, Any], ...], generated_at: Optional[datetime] = None) -> Dict[str, Any]:
+    doc: Dict[str, Any] = {
+        "version": BUNDLE_VERSION,
+        "generated_at": (generated_at or datetime.now()).isoformat(timespec="seconds"),
+    }
+    for (name, _), section in zip(SECTIONS, bundle):
+        doc[name] = section
+    return doc
+
+
+def write_bundle(bundle: Tuple[Dict[str, Any], ...], path: str = BUNDLE_FILE, legacy: bool = False,
+                 project_dir: str = PROJECT_DIR) -> Dict[str, Any]:
+    doc = make_bundle(bundle)
+    atomic_write_json(path, doc)
+    if legacy:
+        # Compatibility output for older readers of the per-file layout
+        for (_, filename), section in zip(SECTIONS, bundle):
+            atomic_write_json(os.path.join(project_dir, filename), section, indent=2)
+    return doc
+
+
+def load_bundle(path: str = BUNDLE_FILE) -> Optional[Tuple[Dict[str, Any], ...]]:
+    try:
+        with open(path, "r") as f:
+            doc = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if doc.get("version") != BUNDLE_VERSION:
+        return None
+    return tuple(doc.get(name) or {} for name, _ in SECTIONS)
+
+
+def load_legacy(project_dir: str = PROJECT_DIR) -> Tuple[Dict[str, Any], ...]:
+    sections = []
+    for _, filename in SECTIONS:
+        path = os.path.join(project_dir, filename)
+        try:
+            with open(path, "r") as f:
+                sections.append(json.load(f))
+        except (OSError, ValueError):
+            sections.append({})
+    return tuple(sections)
+
+
+def load_any(path: str = BUNDLE_FILE, project_dir: str = PROJECT_DIR) -> Tuple[Dict[str, Any], ...]:
+    return load_bundle(path) or load_legacy(project_dir)
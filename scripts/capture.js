@@ -11,8 +11,8 @@ const path = require('path');
     const liveUrl = 'https://moltbotmaxx.github.io/smart-frame/';
     await page.goto(liveUrl, { waitUntil: 'networkidle0' });
 
-    // Wait a moment for layout to settle
-    await new Promise(r => setTimeout(r, 2000));
+    // index.html raises "frame-rendered" once the data and images are drawn
+    await page.waitForFunction(() => window.__frameRendered, { timeout: 15000 });
 
     await page.screenshot({ 
         path: '/Users/maxx/.openclaw/workspace/projects/smart-frame/Dashboard_Latest.png',
@@ -0,0 +1,127 @@
+import json
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Python side of scripts/capture_worker.js.
+# Starts the worker once (node + a warm Chromium page) and asks it for frames
+# over its stdin/stdout pipe; each capture returns the PNG bytes directly.
+# A worker that dies or stops answering is restarted on the next capture.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_JS = os.path.join(PROJECT_DIR, "scripts", "capture_worker.js")
+CAPTURE_URL = os.environ.get("SMART_FRAME_CAPTURE_URL", "http://localhost:8080/")
+NODE = os.environ.get("SMART_FRAME_NODE", "node")
+
+
+class CaptureError(Exception):
+    pass
+
+
+class CaptureWorker:
+    def __init__(self, url: str = CAPTURE_URL, node: str = NODE, timeout: float = 30.0):
+        self.url = url
+        self.node = node
+        self.timeout = timeout
+        self.proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.starts = 0
+        self.last: Dict[str, Any] = {}
+
+    def start(self):
+        self.close()
+        self.proc = subprocess.Popen([self.node, WORKER_JS, self.url], cwd=PROJECT_DIR,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+        self.starts += 1
+
+    def close(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+        self.proc = None
+
+    def _read_exact(self, n: int) -> bytes:
+        chunks = []
+        while n:
+            chunk = self.proc.stdout.read(n)
+            if not chunk:
+                raise CaptureError("worker closed the pipe")
+            chunks.append(chunk)
+            n -= len(chunk)
+        return b"".join(chunks)
+
+    def _request(self, bundle: Optional[Dict[str, Any]]) -> bytes:
+        self._next_id += 1
+        self.proc.stdin.write(json.dumps({"id": self._next_id, "bundle": bundle}, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.proc.stdin.flush()
+
+        # The worker has no deadline on its own reads; enforce ours by killing it
+        timer = threading.Timer(self.timeout, self.proc.kill)
+        timer.start()
+        try:
+            line = self.proc.stdout.readline()
+            if not line:
+                raise CaptureError("worker exited")
+            header = json.loads(line)
+            if not header.get("ok"):
+                raise CaptureError(header.get("error", "capture failed"))
+            png = self._read_exact(header["length"])
+        finally:
+            timer.cancel()
+        self.last = header
+        return png
+
+    def capture(self, bundle: Optional[Dict[str, Any]] = None) -> bytes:
+        # bundle: a bundle.make_bundle() document to draw; None re-fetches bundle.json
+        with self._lock:
+            if self.proc is None or self.proc.poll() is not None:
+                self.start()
+            try:
+                return self._request(bundle)
+            except (CaptureError, OSError, ValueError) as e:
+                print(f"Capture worker failed ({e}), restarting...")
+                self.start()
+            try:
+                return self._request(bundle)
+            except (OSError, ValueError) as e:
+                raise CaptureError(str(e)) from e
+
+
+_WORKER: Optional[CaptureWorker] = None
+
+
+def get_worker(url: str = CAPTURE_URL) -> CaptureWorker:
+    global _WORKER
+    if _WORKER is None or _WORKER.url != url:
+        close_worker()
+        _WORKER = CaptureWorker(url)
+    return _WORKER
+
+
+def close_worker():
+    global _WORKER
+    if _WORKER is not None:
+        _WORKER.close()
+        _WORKER = None
+
+
+if __name__ == "__main__":
+    import sys
+
+    out = sys.argv[1] if len(sys.argv) > 1 else "/tmp/capture.png"
+    worker = get_worker()
+    for i in range(3):
+        start = time.perf_counter()
+        data = worker.capture()
+        print(f"capture {i + 1}: {len(data) / 1024:.0f} KB in {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"(worker {worker.last.get('ms')} ms)")
+    with open(out, "wb") as f:
+        f.write(data)
+    close_worker()
@@ -1,18 +1,26 @@
 
 const puppeteer = require('puppeteer');
+// Usage: node capture_local.js [url] [output.png | -]  (url: scripts/local_server.py)
+// With '-' the PNG is written to stdout instead of a file.
+const url = process.argv[2] || 'http://localhost:8080';
+const out = process.argv[3] || '/Users/maxx/.openclaw/workspace/projects/smart-frame/Dashboard_Latest.png';
 (async () => {
     try {
         const browser = await puppeteer.launch({ headless: true });
         const page = await browser.newPage();
         await page.setViewport({ width: 1024, height: 640 });
-        await page.goto('http://localhost:8080', { waitUntil: 'networkidle0' });
-        await new Promise(r => setTimeout(r, 2000));
-        await page.screenshot({ 
-            path: '/Users/maxx/.openclaw/workspace/projects/smart-frame/Dashboard_Latest.png',
+        await page.goto(url, { waitUntil: 'domcontentloaded' });
+        await page.waitForFunction(() => window.__frameRendered, { timeout: 15000 });
+        const png = await page.screenshot({
+            path: out === '-' ? undefined : out,
             clip: { x: 0, y: 0, width: 1024, height: 640 }
         });
         await browser.close();
-        process.exit(0);
+        if (out === '-') {
+            process.stdout.write(png, () => process.exit(0));
+        } else {
+            process.exit(0);
+        }
     } catch (e) {
         console.error(e);
         process.exit(1);
@@ -0,0 +1,92 @@
+// Persistent capture worker: one warm Chromium page, driven over stdin/stdout.
+//
+// Request  (one JSON line on stdin):  {"id": 1, "bundle": {...}}   bundle optional
+// Response (stdout): one JSON header line, then `length` raw PNG bytes
+//   {"id": 1, "ok": true, "length": 48213, "ms": 212, "frame_id": "2602220356"}
+//   {"id": 1, "ok": false, "error": "..."}
+//
+// With a bundle the page draws it directly (go(bundle)); without one it
+// re-fetches bundle.json. Either way the page is not reloaded: the worker
+// waits for the "frame-rendered" event from index.html, then screenshots.
+// Logs go to stderr so stdout carries only responses.
+
+const puppeteer = require('puppeteer');
+const readline = require('readline');
+
+const URL = process.argv[2] || process.env.SMART_FRAME_CAPTURE_URL || 'http://localhost:8080/';
+const WIDTH = 1024;
+const HEIGHT = 640;
+const RENDER_TIMEOUT = 15000;
+
+let browser = null;
+let page = null;
+
+function log(msg) {
+    process.stderr.write(`[capture_worker] ${msg}\n`);
+}
+
+async function openPage() {
+    if (!browser || !browser.isConnected()) {
+        browser = await puppeteer.launch({ headless: true, args: ['--disable-gpu', '--hide-scrollbars'] });
+        log(`browser started (${await browser.version()})`);
+    }
+    if (page && !page.isClosed()) await page.close().catch(() => {});
+    page = await browser.newPage();
+    await page.setViewport({ width: WIDTH, height: HEIGHT });
+    // First load renders once by itself; wait for it so the page is warm
+    await page.goto(URL, { waitUntil: 'domcontentloaded' });
+    await page.waitForFunction(() => window.__frameRendered, { timeout: RENDER_TIMEOUT });
+    log(`page ready: ${URL}`);
+}
+
+async function capture(bundle) {
+    if (!page || page.isClosed()) await openPage();
+    // Listen first, then redraw: the event cannot fire before we wait for it
+    const done = page.evaluate((timeout) => new Promise((resolve, reject) => {
+        const timer = setTimeout(() => reject(new Error('render timeout')), timeout);
+        window.addEventListener('frame-rendered', (e) => { clearTimeout(timer); resolve(e.detail); }, { once: true });
+    }), RENDER_TIMEOUT);
+    await page.evaluate((b) => { go(b || undefined); }, bundle || null);
+    const detail = await done;
+    if (!detail || !detail.ok) throw new Error((detail && detail.error) || 'render failed');
+    const png = await page.screenshot({ type: 'png', clip: { x: 0, y: 0, width: WIDTH, height: HEIGHT } });
+    return { png: Buffer.from(png), frameId: detail.frame_id };
+}
+
+function respond(header, body) {
+    process.stdout.write(JSON.stringify(header) + '\n');
+    if (body) process.stdout.write(body);
+}
+
+// Requests are handled one at a time, in order, after the warm-up
+let queue = openPage().catch((e) => log(`warm-up failed: ${e.message}`));
+
+readline.createInterface({ input: process.stdin }).on('line', (line) => {
+    queue = queue.then(async () => {
+        let req;
+        try {
+            req = JSON.parse(line);
+        } catch (e) {
+            return respond({ ok: false, error: 'bad request' });
+        }
+        const start = Date.now();
+        try {
+            let result;
+            try {
+                result = await capture(req.bundle);
+            } catch (e) {
+                // Crashed tab or browser: start over once
+                log(`capture failed (${e.message}), reopening page`);
+                await openPage();
+                result = await capture(req.bundle);
+            }
+            respond({ id: req.id, ok: true, length: result.png.length, ms: Date.now() - start, frame_id: result.frameId }, result.png);
+        } catch (e) {
+            respond({ id: req.id, ok: false, error: e.message });
+        }
+    });
+}).on('close', async () => {
+    await queue;
+    if (browser) await browser.close().catch(() => {});
+    process.exit(0);
+});
@@ -0,0 +1,224 @@
+import fcntl
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import update
+from capture_client import close_worker
+from devices import close_device_sessions
+from fingerprint import fingerprint, last_delivered
+from prerender import PrerenderQueue, deliver
+from http_cache import wait_for_revalidation
+from state_store import get_store
+from tracing import count, flush as flush_metrics
+
+# Resident update service.
+# Replaces the one-shot agent turn from run_update.sh: the process stays up,
+# every source is refreshed on its own schedule (with jitter, and exponential
+# backoff while it keeps failing), and update.run_cycle() only re-renders and
+# uploads when the refreshed data changed the frame (fingerprint check).
+# With SMART_FRAME_PRERENDER=1 (default) frames go out on the delivery slots
+# instead: refreshes only update the data and the pre-render queue
+# (scripts/prerender.py), and each slot boundary just uploads its frame.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCK_FILE = os.path.join(PROJECT_DIR, ".cache", "daemon.lock")
+
+# Seconds between refreshes per source (SMART_FRAME_INTERVAL_<NAME> overrides)
+INTERVALS = {
+    "weather": 10 * 60,
+    "instagram": 30 * 60,
+    "news": 60 * 60,
+}
+JITTER = 0.1                  # +/- fraction of the interval
+RETRY_BASE = 60               # first retry of a failing source, doubled per failure
+DELIVERY_RETRY = 2 * 60       # first retry after a failed upload, doubled per failure
+MAX_BACKOFF = 60 * 60         # cap for both
+TICK = 5                      # scheduler resolution in seconds
+PRERENDER = os.environ.get("SMART_FRAME_PRERENDER", "1") == "1"
+
+
+def _interval(name: str) -> float:
+    return float(os.environ.get(f"SMART_FRAME_INTERVAL_{name.upper()}", INTERVALS.get(name, 30 * 60)))
+
+
+class Schedule:
+    # Due time and failure streak per source
+    def __init__(self, names, now: Optional[float] = None):
+        now = now or time.time()
+        self.due: Dict[str, float] = {name: now for name in names}
+        self.failures: Dict[str, int] = {name: 0 for name in names}
+
+    def due_now(self, now: float):
+        return sorted(name for name, at in self.due.items() if at <= now)
+
+    def done(self, name: str, ok: bool, now: float):
+        self.failures[name] = 0 if ok else self.failures[name] + 1
+        if ok:
+            delay = _interval(name)
+        else:
+            delay = min(RETRY_BASE * 2 ** (self.failures[name] - 1), MAX_BACKOFF)
+        self.due[name] = now + delay * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def next_due(self) -> float:
+        return min(self.due.values())
+
+
+def _undelivered() -> bool:
+    # The stored snapshot differs from the last frame that reached the device
+    snapshot = get_store(update.STATE_DB).get_snapshot()
+    return snapshot is not None and fingerprint(snapshot) != last_delivered()
+
+
+def _refresh(schedule: Schedule, due):
+    # Slot mode: refresh the due sources and save the snapshot, no delivery
+    start = time.time()
+    print(f"[{datetime.now()}] Refresh: {', '.join(due)}")
+    try:
+        bundle = update.update_data(sources=due)
+    except Exception as e:
+        print(f"Refresh failed: {e}")
+        bundle = get_store(update.STATE_DB).get_snapshot()
+    results: Dict[str, Any] = update.last_results
+    for name in due:
+        r = results.get(name)
+        schedule.done(name, bool(r and not r["error"]), time.time())
+        if r and r["error"]:
+            print(f"{name}: failure {schedule.failures[name]}, next try in "
+                  f"{(schedule.due[name] - time.time()) / 60:.1f} min")
+    print(f"[{datetime.now()}] Refresh done in {time.time() - start:.1f}s")
+    return bundle
+
+
+def _deliver_slot(queue: PrerenderQueue, bundle, slot: datetime) -> str:
+    # Uploads the queued frame for the slot that just started (or a retried one);
+    # renders it on the spot if pre-rendering did not get to it
+    entry = queue.take()
+    if entry is None:
+        print(f"No pre-rendered frame for {slot:%H:%M}, rendering now")
+        count("prerender_misses")
+        try:
+            entry = queue.build(bundle, slot)
+        except Exception as e:
+            print(f"Render failed: {e}")
+            count("deliveries_failed")
+            return "failed"
+    status = deliver(entry)
+    if status == "failed":
+        queue.put_back(entry)
+    return status
+
+
+def _acquire_lock():
+    os.makedirs(os.path.dirname(LOCK_FILE), exist_ok=True)
+    handle = open(LOCK_FILE, "w")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    handle.write(str(os.getpid()))
+    handle.flush()
+    return handle
+
+
+def serve(stop: Optional[threading.Event] = None):
+    stop = stop or threading.Event()
+    # Keep the HTTP cache from answering for longer than the weather schedule
+    update.WEATHER_CACHE_TTL = min(update.WEATHER_CACHE_TTL, _interval("weather"))
+
+    schedule = Schedule(update.SOURCES)
+    retry_delivery_at: Optional[float] = None
+    delivery_failures = 0
+    queue = PrerenderQueue() if PRERENDER else None
+    upcoming = queue.next_slot() if queue else None
+    current = None
+    bundle = None
+    print(f"[{datetime.now()}] Daemon started (pid {os.getpid()}), intervals: "
+          + ", ".join(f"{n} {_interval(n) / 60:.0f}m" for n in update.SOURCES)
+          + (f", slots at :{', :'.join(f'{m:02d}' for m in queue.minutes)}" if queue else ""))
+
+    while not stop.is_set():
+        now = time.time()
+        due = schedule.due_now(now)
+        retry = retry_delivery_at is not None and retry_delivery_at <= now
+        if queue is not None:
+            if due:
+                bundle = _refresh(schedule, due) or bundle
+            started = datetime.now() >= upcoming
+            if started:
+                current, upcoming = upcoming, queue.next_slot()
+            if bundle is not None and (started or retry):
+                if _deliver_slot(queue, bundle, current) == "failed":
+                    delivery_failures += 1
+                    retry_delivery_at = time.time() + min(DELIVERY_RETRY * 2 ** (delivery_failures - 1), MAX_BACKOFF)
+                else:
+                    delivery_failures, retry_delivery_at = 0, None
+            if bundle is not None and (due or started or retry):
+                built = queue.fill(bundle)
+                if built:
+                    print(f"[{datetime.now()}] Pre-rendered {built} frame(s), next slot {upcoming:%H:%M}")
+                flush_metrics(get_store(update.STATE_DB))
+            wake = min([schedule.next_due(), upcoming.timestamp()] + ([retry_delivery_at] if retry_delivery_at else []))
+            stop.wait(max(0.0, min(TICK, wake - time.time())))
+            continue
+
+        if due or retry:
+            start = time.time()
+            print(f"[{datetime.now()}] Cycle: {', '.join(due) or 'delivery retry'}")
+            try:
+                delivered = update.run_cycle(sources=due)
+                pending = not delivered and _undelivered()
+            except Exception as e:
+                print(f"Cycle failed: {e}")
+                delivered, pending = False, True
+            results: Dict[str, Any] = update.last_results
+            for name in due:
+                r = results.get(name)
+                schedule.done(name, bool(r and not r["error"]), time.time())
+                if r and r["error"]:
+                    print(f"{name}: failure {schedule.failures[name]}, next try in "
+                          f"{(schedule.due[name] - time.time()) / 60:.1f} min")
+
+            if pending:
+                delivery_failures += 1
+                retry_delivery_at = time.time() + min(DELIVERY_RETRY * 2 ** (delivery_failures - 1), MAX_BACKOFF)
+            else:
+                delivery_failures, retry_delivery_at = 0, None
+            print(f"[{datetime.now()}] Cycle done in {time.time() - start:.1f}s"
+                  f" ({'delivered' if delivered else 'not delivered'})")
+
+        wake = min([schedule.next_due()] + ([retry_delivery_at] if retry_delivery_at else []))
+        stop.wait(max(0.0, min(TICK, wake - time.time())))
+
+    close_device_sessions()
+    close_worker()
+    wait_for_revalidation()
+    update.PUBLISHER.wait()
+    flush_metrics(get_store(update.STATE_DB))
+    print(f"[{datetime.now()}] Daemon stopped.")
+
+
+if __name__ == "__main__":
+    if "--once" in sys.argv:
+        update.run_cycle()
+        close_device_sessions()
+        close_worker()
+        wait_for_revalidation()
+        update.PUBLISHER.wait()
+        sys.exit(0)
+
+    lock = _acquire_lock()
+    if lock is None:
+        print("Daemon already running.")
+        sys.exit(0)
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    serve(stop)
@@ -0,0 +1,107 @@
+import os
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Publishing the dashboard data to a dedicated git branch.
+# The published files are staged into a private index under .cache/, so
+# git's stat cache re-hashes only the files that changed and the checkout's
+# own index, HEAD and branches are never touched. A commit is written with
+# plumbing (write-tree / commit-tree) only when the tree differs from the
+# last one, and pushed to the data branch. Every SQUASH_AFTER commits the
+# branch is restarted as a single root commit, so the history (and what a
+# clone or push carries) stays bounded. The branch belongs to the publisher:
+# pushes are forced.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BRANCH = os.environ.get("SMART_FRAME_PUBLISH_BRANCH", "dashboard-data")
+REMOTE = os.environ.get("SMART_FRAME_PUBLISH_REMOTE", "origin")
+SQUASH_AFTER = int(os.environ.get("SMART_FRAME_PUBLISH_SQUASH", "48"))
+AUTHOR = {"GIT_AUTHOR_NAME": "smart-frame", "GIT_AUTHOR_EMAIL": "smart-frame@localhost",
+          "GIT_COMMITTER_NAME": "smart-frame", "GIT_COMMITTER_EMAIL": "smart-frame@localhost"}
+
+
+class DataBranch:
+    def __init__(self, project_dir: str = PROJECT_DIR, branch: str = BRANCH, remote: Optional[str] = REMOTE,
+                 squash_after: int = SQUASH_AFTER):
+        self.project_dir = project_dir
+        self.branch = branch
+        self.remote = remote
+        self.squash_after = squash_after
+        # Local ref outside refs/heads: no reflog, not a checkout-able branch
+        self.ref = f"refs/publish/{branch}"
+        self.pushed_ref = f"refs/publish/pushed/{branch}"
+        self.index_file = os.path.join(project_dir, ".cache", f"publish-{branch}.index")
+
+    def _git(self, *args: str, index: bool = False) -> str:
+        env = dict(os.environ, **AUTHOR)
+        if index:
+            env["GIT_INDEX_FILE"] = self.index_file
+        out = subprocess.run(["git", "-C", self.project_dir] + list(args), env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(f"git {args[0]} failed: {out.stderr.strip() or out.returncode}")
+        return out.stdout.strip()
+
+    def _resolve(self, ref: str) -> Optional[str]:
+        try:
+            return self._git("rev-parse", "--verify", "--quiet", ref) or None
+        except RuntimeError:
+            return None
+
+    def head(self) -> Optional[str]:
+        return self._resolve(self.ref)
+
+    def depth(self, commit: str) -> int:
+        return int(self._git("rev-list", "--count", commit))
+
+    def stage(self, paths: List[str]) -> str:
+        # Returns the tree id of `paths` as they are on disk now
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        present = [p for p in paths if os.path.exists(os.path.join(self.project_dir, p))]
+        missing = [p for p in paths if p not in present]
+        # -A also drops files that disappeared inside a path (e.g. evicted cached images)
+        if present:
+            self._git("add", "-A", "--", *present, index=True)
+        if missing:
+            self._git("rm", "-r", "-q", "--cached", "--ignore-unmatch", "--", *missing, index=True)
+        return self._git("write-tree", index=True)
+
+    def publish(self, paths: List[str], message: Optional[str] = None) -> Dict[str, Any]:
+        # Returns {"commit", "changed", "squashed", "pushed"}; "commit" is None
+        # when nothing changed since the last publish (no new commit)
+        tree = self.stage(paths)
+        parent = self.head()
+        result: Dict[str, Any] = {"commit": None, "changed": 0, "squashed": False, "pushed": False}
+        if parent is None or self._git("rev-parse", f"{parent}^{{tree}}") != tree:
+            if parent:
+                result["changed"] = len(self._git("diff-tree", "-r", "--name-only", parent, tree).splitlines())
+            else:
+                result["changed"] = len(self._git("ls-tree", "-r", "--name-only", tree).splitlines())
+            result["squashed"] = parent is None or self.depth(parent) >= self.squash_after
+            message = message or f"Update Dashboard Data {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+            commit = self._git("commit-tree", tree, "-m", message, *([] if result["squashed"] else ["-p", parent]))
+            self._git("update-ref", self.ref, commit, *([parent] if parent else []))
+            result["commit"] = commit
+
+        # A commit whose push failed is pushed by the next publish, changed or not
+        head = result["commit"] or parent
+        if self.remote and head != self._resolve(self.pushed_ref):
+            self._git("push", "--quiet", self.remote, f"+{head}:refs/heads/{self.branch}")
+            self._git("update-ref", self.pushed_ref, head)
+            result["pushed"] = True
+        if result["squashed"] and parent:
+            # The old chain is unreachable now; let git drop it when it is worth it
+            subprocess.call(["git", "-C", self.project_dir, "gc", "--auto", "--quiet"])
+        return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    branch = DataBranch()
+    head = branch.head()
+    if head is None:
+        print(f"{branch.ref}: nothing published yet")
+        sys.exit(0)
+    print(f"{branch.ref} {head[:12]}, {branch.depth(head)}/{branch.squash_after} commits before the next squash")
@@ -0,0 +1,310 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from encode import encode_frame
+from ftp_client import FTP_HOST, FTP_PORT, FrameFTP
+from state_store import get_store
+from tracing import attach, count, current, gauge, span
+
+# Device registry and fan-out delivery.
+# devices.json lists every frame with its own FTP endpoint, resolution,
+# accepted formats / byte budget and slot policy:
+#   "rotate"   - rename the current files to old_*, upload, delete old_*
+#   "ring"     - overwrite a fixed ring of `keep` slots (Frame_0000001.png ...) in order
+#   "overwrite"- upload straight over the file names
+# encode_for() encodes once per distinct profile; deliver_all() uploads to every
+# device in parallel, so a slow or offline frame only times out its own worker.
+#
+# What each frame holds is tracked in a manifest in the state store, so a
+# normal cycle needs no remote listing. The server is listed and cleaned up
+# (reconciled) only when there is no manifest, after a failed delivery, or
+# every RECONCILE_EVERY seconds.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEVICES_FILE = os.environ.get("SMART_FRAME_DEVICES", os.path.join(PROJECT_DIR, "devices.json"))
+DELIVERY_TIMEOUT = 60  # seconds per device, including reconnects
+RECONCILE_EVERY = 6 * 3600
+
+DEFAULTS: Dict[str, Any] = {
+    "port": 21,
+    "user": "anonymous",
+    "password": "",
+    "width": 1024,
+    "height": 640,
+    "formats": ["png"],
+    "budget": 200000,
+    "slots": "rotate",
+    "files": ["Dashboard_Latest"],
+    "keep": 2,
+    "enabled": True,
+}
+
+Source = Union[Image.Image, str, bytes]
+
+
+def _normalize(device: Dict[str, Any]) -> Dict[str, Any]:
+    d = dict(DEFAULTS, **device)
+    d["port"] = int(d["port"])
+    d.setdefault("name", f"{d['host']}:{d['port']}")
+    if d["slots"] not in SLOT_POLICIES:
+        raise ValueError(f"Unknown slot policy for {d['name']}: {d['slots']}")
+    return d
+
+
+def load_devices(path: str = DEVICES_FILE, include_disabled: bool = False) -> List[Dict[str, Any]]:
+    try:
+        with open(path, "r") as f:
+            entries = json.load(f).get("devices", [])
+    except FileNotFoundError:
+        # No registry yet: the single frame the scripts always targeted
+        entries = [{"name": "frame", "host": FTP_HOST, "port": FTP_PORT,
+                    "files": ["Dashboard_Latest", "Dashboard_Latest_Copy"]}]
+    devices = [_normalize(e) for e in entries]
+    return devices if include_disabled else [d for d in devices if d["enabled"]]
+
+
+def profile_key(device: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (device["width"], device["height"], tuple(device["formats"]), device["budget"])
+
+
+def encode_for(source: Source, devices: List[Dict[str, Any]]) -> Dict[Tuple[Any, ...], Dict[str, Any]]:
+    # One encode per distinct (size, formats, budget); devices that share a profile share the bytes
+    frames: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for device in devices:
+        key = profile_key(device)
+        if key in frames:
+            continue
+        with span("encode", width=device["width"], height=device["height"]) as attrs:
+            frame = encode_frame(source, formats=device["formats"], budget=device["budget"],
+                                 size=(device["width"], device["height"]))
+            attrs.update(format=frame["format"], bytes=frame["size"], attempts=frame["attempts"])
+        print(f"Encoded {device['width']}x{device['height']} {frame['format']} {frame['settings']}: "
+              f"{frame['size'] / 1024:.0f} KB in {frame['encode_ms']:.0f} ms")
+        frames[key] = frame
+    return frames
+
+
+# --- Remote manifest ---
+
+# One manifest per device and slot policy: update.py rotates the Dashboard_*
+# files and sync_strict.py fills the Frame_* ring on the same server.
+
+def _manifest_key(device: Dict[str, Any], policy: str) -> str:
+    return f"manifest:{device['name']}:{policy}"
+
+
+def load_manifest(device: Dict[str, Any], policy: str) -> Dict[str, Any]:
+    # {"files": [remote names], "next": ring position, "reconciled": ts, "dirty": bool}
+    return get_store().get(_manifest_key(device, policy)) or {"files": [], "next": 0, "reconciled": 0, "dirty": True}
+
+
+def save_manifest(device: Dict[str, Any], policy: str, manifest: Dict[str, Any]):
+    get_store().set(_manifest_key(device, policy), manifest)
+
+
+def mark_dirty(device: Dict[str, Any], policy: Optional[str] = None):
+    # After a failed delivery the remote state is unknown; list it next time
+    for p in [policy] if policy else SLOT_POLICIES:
+        manifest = load_manifest(device, p)
+        manifest["dirty"] = True
+        save_manifest(device, p, manifest)
+
+
+def _needs_reconcile(manifest: Dict[str, Any]) -> bool:
+    return manifest["dirty"] or time.time() - manifest["reconciled"] > RECONCILE_EVERY
+
+
+def _reconciled(manifest: Dict[str, Any], files: List[Any]) -> Dict[str, Any]:
+    return dict(manifest, files=files, dirty=False, reconciled=time.time())
+
+
+# --- Slot policies ---
+# Each takes the session, the device, the frame and its manifest, and
+# returns (uploaded names, updated manifest).
+
+Manifest = Dict[str, Any]
+
+
+def _rotate(ftp: FrameFTP, device: Dict[str, Any], frame: Dict[str, Any], manifest: Manifest) -> Tuple[List[str], Manifest]:
+    names = [f"{base}.{frame['ext']}" for base in device["files"]]
+    prefixes = tuple(base + "." for base in device["files"])
+    reconcile = _needs_reconcile(manifest)
+    if reconcile:
+        # Also catches old_* files left by an interrupted run
+        remote = ftp.list()
+        existing = [n for n in remote if n.startswith(prefixes)]
+        stale = [n for n in remote if n.startswith("old_")]
+    else:
+        existing, stale = manifest["files"], []
+    # Same order as before: park the current files, upload, then drop the parked ones
+    deleted = ftp.run_batch([("delete", n) for n in stale])
+    parked = [r["args"][1] for r in ftp.run_batch([("rename", n, f"old_{n}") for n in existing]) if r["ok"]]
+    for name in names:
+        ftp.upload(frame["data"], name)
+    deleted += ftp.run_batch([("delete", n) for n in parked])
+    manifest = _reconciled(manifest, names) if reconcile else dict(manifest, files=names)
+    # A rename or delete that failed means the manifest was off; list next time
+    manifest["dirty"] = len(parked) < len(existing) or not all(r["ok"] for r in deleted)
+    return names, manifest
+
+
+def _ring(ftp: FrameFTP, device: Dict[str, Any], frame: Dict[str, Any], manifest: Manifest) -> Tuple[List[str], Manifest]:
+    slots = device["keep"]
+    files = list(manifest["files"])
+    if len(files) != slots:
+        files, manifest = (files + [None] * slots)[:slots], dict(manifest, dirty=True)
+    position = manifest["next"] % slots
+    name = f"Frame_{position + 1:07d}.{frame['ext']}"
+    ftp.upload(frame["data"], name)
+    previous, files[position] = files[position], name
+    manifest = dict(manifest, next=(position + 1) % slots)
+
+    if _needs_reconcile(manifest):
+        # Delete every Frame_* file outside the ring (older numbering, other
+        # formats, a smaller `keep`) and adopt ring names already present
+        ring = {f"Frame_{i + 1:07d}.{frame['ext']}": i for i in range(slots)}
+        remote = ftp.list("Frame_*")
+        for n in remote:
+            if n in ring and files[ring[n]] is None:
+                files[ring[n]] = n
+        keep = set(files)
+        deleted = ftp.run_batch([("delete", n) for n in remote if n not in keep])
+        return [name], dict(_reconciled(manifest, files), dirty=not all(r["ok"] for r in deleted))
+    if previous and previous != name:
+        # Same slot, different format
+        ftp.delete(previous)
+    return [name], dict(manifest, files=files)
+
+
+def _overwrite(ftp: FrameFTP, device: Dict[str, Any], frame: Dict[str, Any], manifest: Manifest) -> Tuple[List[str], Manifest]:
+    names = [f"{base}.{frame['ext']}" for base in device["files"]]
+    for name in names:
+        ftp.upload(frame["data"], name)
+    return names, dict(manifest, files=names, dirty=False)
+
+
+SLOT_POLICIES = {"rotate": _rotate, "ring": _ring, "overwrite": _overwrite}
+
+# One session per (host, port), used by one worker at a time
+_sessions: Dict[Tuple[str, int], FrameFTP] = {}
+_session_locks: Dict[Tuple[str, int], threading.Lock] = {}
+_sessions_lock = threading.Lock()
+
+
+def _session(device: Dict[str, Any]) -> Tuple[FrameFTP, threading.Lock]:
+    key = (device["host"], device["port"])
+    with _sessions_lock:
+        if key not in _sessions:
+            _sessions[key] = FrameFTP(device["host"], device["port"], user=device["user"], password=device["password"])
+            _session_locks[key] = threading.Lock()
+        return _sessions[key], _session_locks[key]
+
+
+def close_device_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _session_locks.clear()
+
+
+def deliver(device: Dict[str, Any], frame: Dict[str, Any], slots: Optional[str] = None) -> List[str]:
+    ftp, lock = _session(device)
+    policy = slots or device["slots"]
+    # A worker abandoned by an earlier timeout may still hold the session
+    if not lock.acquire(timeout=DELIVERY_TIMEOUT):
+        raise TimeoutError("previous delivery to this host is still running")
+    try:
+        with span("upload", device=device["name"], host=device["host"]) as attrs:
+            manifest = load_manifest(device, policy)
+            attrs["reconcile"] = _needs_reconcile(manifest)
+            files, manifest = SLOT_POLICIES[policy](ftp, device, frame, manifest)
+            save_manifest(device, policy, manifest)
+            attrs.update(files=files, bytes=frame["size"] * len(files))
+    except Exception:
+        mark_dirty(device, policy)
+        raise
+    finally:
+        lock.release()
+    count("bytes_uploaded", frame["size"] * len(files), device=device["name"])
+    return files
+
+
+def _record(results: Dict[str, Dict[str, Any]]):
+    store = get_store()
+    status = store.get("device_status", {})
+    now = datetime.now().isoformat(timespec="seconds")
+    for name, r in results.items():
+        s = status.setdefault(name, {"failures": 0})
+        if r["ok"]:
+            s.update(last_ok=now, failures=0, last_error=None)
+            gauge("last_delivery_timestamp_seconds", round(time.time()), device=name)
+            count("deliveries", device=name)
+        else:
+            s.update(failures=s.get("failures", 0) + 1, last_error=r["error"], last_failed=now)
+            count("deliveries_failed", device=name)
+    store.set("device_status", status)
+
+
+def deliver_all(frames: Dict[Tuple[Any, ...], Dict[str, Any]], devices: List[Dict[str, Any]],
+                slots: Optional[str] = None, timeout: float = DELIVERY_TIMEOUT) -> Dict[str, Dict[str, Any]]:
+    # frames: encode_for() output. Returns {device name: {"ok", "files", "bytes", "format", "elapsed", "error"}}
+
+    context = current()
+
+    def _run(device):
+        t0 = time.monotonic()
+        frame = frames[profile_key(device)]
+        try:
+            with attach(context):
+                files = deliver(device, frame, slots)
+            return {"ok": True, "files": files, "bytes": frame["size"] * len(files), "format": frame["format"],
+                    "elapsed": time.monotonic() - t0, "error": None}
+        except Exception as e:
+            return {"ok": False, "files": [], "bytes": 0, "format": frame["format"],
+                    "elapsed": time.monotonic() - t0, "error": f"{type(e).__name__}: {e}"}
+
+    results: Dict[str, Dict[str, Any]] = {}
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max(1, len(devices)), thread_name_prefix="deliver")
+    futures = {d["name"]: pool.submit(_run, d) for d in devices}
+    try:
+        for name, future in futures.items():
+            done, _ = wait([future], timeout=max(0.0, started + timeout - time.monotonic()))
+            results[name] = future.result() if done else {
+                "ok": False, "files": [], "bytes": 0, "format": None,
+                "elapsed": time.monotonic() - started, "error": "delivery timeout"}
+    finally:
+        # A hung frame keeps its worker; everyone else is already done
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    for name, r in results.items():
+        print(f"  {name}: " + (f"{', '.join(r['files'])} ({r['bytes'] / 1024:.0f} KB, {r['elapsed']:.1f}s)"
+                               if r["ok"] else f"FAILED ({r['error']})"))
+    _record(results)
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        for name, s in get_store().get("device_status", {}).items():
+            print(f"{name}: last ok {s.get('last_ok')}, failures {s.get('failures')}, last error {s.get('last_error')}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "reconcile":
+        # List and clean up every frame on its next delivery
+        for d in load_devices():
+            mark_dirty(d)
+            print(f"{d['name']}: will reconcile on next delivery")
+    else:
+        for d in load_devices(include_disabled=True):
+            print(f"{d['name']}: ftp://{d['host']}:{d['port']} {d['width']}x{d['height']} "
+                  f"{'/'.join(d['formats'])} budget={d['budget']} slots={d['slots']}"
+                  + ("" if d["enabled"] else " (disabled)"))
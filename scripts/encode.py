@@ -0,0 +1,116 @@
+import io
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from PIL import Image
+
+# Output encoder for frame images.
+# Turns a rendered/captured frame into the smallest file that still fits the
+# frame's constraints: optimized PNG, palette PNG, or JPEG/WebP when the
+# target frame accepts them. With a byte budget it walks a quality ladder
+# and stops at the first setting that fits.
+
+EXTENSIONS = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+
+# PNG settings, best quality first. Level 9 truecolor only buys ~5% over
+# level 6 at ~7x the time, so it is only tried when that is enough to fit.
+PNG_LADDER: List[Dict[str, Any]] = [
+    {"format": "png", "compress_level": 6},
+    {"format": "png", "optimize": True, "max_gain": 0.1},
+    {"format": "png", "colors": 256, "optimize": True},
+    {"format": "png", "colors": 128, "optimize": True},
+    {"format": "png", "colors": 64, "optimize": True},
+]
+LOSSY_QUALITIES = (90, 85, 80, 72, 64, 55, 45)
+
+
+def _encode_once(img: Image.Image, settings: Dict[str, Any]) -> bytes:
+    buf = io.BytesIO()
+    fmt = settings["format"]
+    if fmt == "png":
+        if settings.get("colors"):
+            # Dashboard is flat UI + two photos; an octree palette holds up well
+            img = img.quantize(colors=settings["colors"], method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        img.save(buf, format="PNG", optimize=settings.get("optimize", False),
+                 compress_level=settings.get("compress_level", 9))
+    elif fmt == "jpeg":
+        img.save(buf, format="JPEG", quality=settings["quality"], optimize=True, progressive=False, subsampling="4:2:0")
+    elif fmt == "webp":
+        img.save(buf, format="WEBP", quality=settings["quality"], method=4)
+    else:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    return buf.getvalue()
+
+
+def candidates(formats: Iterable[str]) -> List[Dict[str, Any]]:
+    # Quality ladder for the accepted formats, best first
+    ladder: List[Dict[str, Any]] = []
+    formats = list(formats)
+    if "png" in formats:
+        ladder.extend(PNG_LADDER)
+    for q in LOSSY_QUALITIES:
+        for fmt in ("webp", "jpeg"):
+            if fmt in formats:
+                ladder.append({"format": fmt, "quality": q})
+    return ladder
+
+
+def encode_frame(source: Union[Image.Image, str, bytes], formats: Iterable[str] = ("png",),
+                 budget: Optional[int] = None, size: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    # source: PIL image, path or encoded bytes. formats: what the target frame accepts.
+    # Returns {"data", "format", "ext", "size", "encode_ms", "settings", "attempts", "within_budget"}.
+    start = time.perf_counter()
+    if isinstance(source, Image.Image):
+        img = source
+    else:
+        img = Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source)
+        img.load()
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if size and img.size != tuple(size):
+        img = img.resize(tuple(size), Image.LANCZOS)
+
+    ladder = candidates(formats)
+    if not ladder:
+        raise ValueError(f"No supported output format in {list(formats)}")
+    if budget is None:
+        # No budget: the top setting (fast lossless PNG, or the best lossy quality)
+        ladder = ladder[:1]
+
+    best: Optional[Tuple[bytes, Dict[str, Any]]] = None
+    attempts = 0
+    for settings in ladder:
+        if budget is not None and best is not None and settings.get("max_gain"):
+            if len(best[0]) * (1 - settings["max_gain"]) > budget:
+                continue
+        data = _encode_once(img, settings)
+        attempts += 1
+        if best is None or len(data) < len(best[0]):
+            best = (data, settings)
+        if budget is None or len(data) <= budget:
+            best = (data, settings)
+            break
+
+    data, settings = best  # type: ignore[misc]
+    settings = {k: v for k, v in settings.items() if k != "max_gain"}
+    return {
+        "data": data,
+        "format": settings["format"],
+        "ext": EXTENSIONS[settings["format"]],
+        "size": len(data),
+        "encode_ms": (time.perf_counter() - start) * 1000,
+        "settings": settings,
+        "attempts": attempts,
+        "within_budget": budget is None or len(data) <= budget,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1]
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    formats = sys.argv[3].split(",") if len(sys.argv) > 3 else ["png"]
+    result = encode_frame(path, formats=formats, budget=budget)
+    print(f"{result['format']} {result['settings']}: {result['size'] / 1024:.0f} KB "
+          f"in {result['encode_ms']:.0f} ms ({result['attempts']} attempts)")
@@ -0,0 +1,197 @@
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from tracing import attach, current
+
+# Concurrent fetch engine for the dashboard data sources.
+# Every source runs in its own worker with its own deadline and retry budget,
+# and produces a result dict instead of raising, so one hung or failing API
+# never blocks (or wipes) the others.
+
+DEFAULT_TIMEOUT = 10.0   # seconds per HTTP request
+DEFAULT_DEADLINE = 20.0  # seconds per source, including retries
+DEFAULT_RETRIES = 2
+BACKOFF_BASE = 0.5       # seconds, doubled per attempt, with jitter
+USER_AGENT = "smart-frame/1.0"
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, reason: str, url: str):
+        super().__init__(f"HTTP {status} {reason} for {url}")
+        self.status = status
+
+
+class HttpClient:
+    # Small keep-alive client on top of http.client.
+    # Idle connections are pooled per (scheme, host, port) and handed out to
+    # whichever worker thread needs one, so repeated requests to the same API
+    # reuse one TCP/TLS session across sources and cycles.
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, max_idle: int = 4):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _acquire(self, key: Tuple[str, str, int], timeout: float) -> http.client.HTTPConnection:
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            scheme, host, port = key
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = cls(host, port, timeout=timeout)
+            self.connections_opened += 1
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _release(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, url: str, headers: Optional[Dict[str, str]] = None,
+                timeout: Optional[float] = None) -> Tuple[int, Dict[str, str], bytes]:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        key = (scheme, parts.hostname or "", parts.port or (443 if scheme == "https" else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        hdrs = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity", "Connection": "keep-alive"}
+        hdrs.update(headers or {})
+
+        # A pooled connection may have been closed by the server while idle;
+        # retry exactly once on a fresh connection in that case.
+        for retry_stale in (True, False):
+            conn = self._acquire(key, timeout or self.timeout)
+            reused = conn.sock is not None
+            try:
+                conn.request("GET", path, headers=hdrs)
+                resp = conn.getresponse()
+                body = resp.read()
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    BrokenPipeError, ConnectionResetError):
+                conn.close()
+                if retry_stale and reused:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+        raise RuntimeError("unreachable")
+
+    def get_json(self, url: str, timeout: Optional[float] = None) -> Any:
+        status, _, body = self.request(url, timeout=timeout)
+        if status != 200:
+            raise HttpError(status, http.client.responses.get(status, ""), url)
+        return json.loads(body)
+
+    def close(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for conn in idle:
+                conn.close()
+
+
+# Shared client so repeated cycles (e.g. the daemon) keep their connections
+CLIENT = HttpClient()
+
+
+def with_retries(fn: Callable[[], Any], retries: int = DEFAULT_RETRIES,
+                 deadline: Optional[float] = None, backoff: float = BACKOFF_BASE) -> Tuple[Any, int]:
+    # Returns (value, attempts). Raises the last error once retries or the deadline
+    # run out, with the number of attempts made as its `attempts` attribute.
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return fn(), attempt
+        except HttpError as e:
+            error: Exception = e
+            # Client errors will not fix themselves
+            if 400 <= e.status < 500 and e.status != 429:
+                break
+        except Exception as e:
+            error = e
+        if attempt > retries:
+            break
+        delay = backoff * (2 ** (attempt - 1)) * (0.5 + random.random())
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            break
+        time.sleep(delay)
+    error.attempts = attempt  # type: ignore[attr-defined]
+    raise error
+
+
+def fetch_all(sources: Dict[str, Callable[[HttpClient], Any]], client: Optional[HttpClient] = None,
+              deadlines: Optional[Dict[str, float]] = None, retries: int = DEFAULT_RETRIES,
+              fallbacks: Optional[Dict[str, Callable[[Exception], Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    # sources maps a name to fn(client) -> data. Returns one result per source:
+    #   {"name", "ok", "data", "error", "attempts", "elapsed"}
+    # fallbacks maps a name to fn(error) -> data, tried once retries or the
+    # deadline are used up (e.g. a cached copy); a result served by it is ok
+    # and keeps the error.
+    client = client or CLIENT
+    deadlines = deadlines or {}
+    fallbacks = fallbacks or {}
+    started = time.monotonic()
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def _fallback(result: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        fallback = fallbacks.get(result["name"])
+        if fallback is None:
+            return result
+        try:
+            return dict(result, ok=True, data=fallback(error))
+        except Exception:
+            return result
+
+    context = current()
+
+    def _run(name, fn):
+        t0 = time.monotonic()
+        until = t0 + deadlines.get(name, DEFAULT_DEADLINE)
+        try:
+            with attach(context):
+                data, attempts = with_retries(lambda: fn(client), retries=retries, deadline=until)
+            return {"name": name, "ok": True, "data": data, "error": None,
+                    "attempts": attempts, "elapsed": time.monotonic() - t0}
+        except Exception as e:
+            return _fallback({"name": name, "ok": False, "data": None, "error": f"{type(e).__name__}: {e}",
+                              "attempts": getattr(e, "attempts", 1), "elapsed": time.monotonic() - t0}, e)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, len(sources)), thread_name_prefix="fetch")
+    futures = {name: pool.submit(_run, name, fn) for name, fn in sources.items()}
+    try:
+        for name, future in futures.items():
+            remaining = started + deadlines.get(name, DEFAULT_DEADLINE) - time.monotonic()
+            done, _ = wait([future], timeout=max(0.0, remaining))
+            if done:
+                results[name] = future.result()
+            else:
+                results[name] = _fallback({"name": name, "ok": False, "data": None, "error": "deadline exceeded",
+                                           "attempts": 0, "elapsed": time.monotonic() - started},
+                                          TimeoutError("deadline exceeded"))
+    finally:
+        # Do not wait for hung workers; their sockets time out on their own.
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Optional
+
+from state_store import get_store
+
+# Content fingerprint of the rendered inputs.
+# Two bundles that would draw the same frame (apart from clocks and ids)
+# hash to the same value, so a cycle can tell that nothing visible changed.
+
+# Fields that change every cycle without changing the content of the frame
+VOLATILE_KEYS = {"last_update_time", "frame_id", "last_updated", "last_post_timestamp"}
+
+# What to do when the fingerprint matches the last delivered frame:
+#   "always"  - deliver every cycle (previous behaviour)
+#   "skip"    - skip write, commit, capture and FTP entirely
+#   "refresh" - only rewrite the local JSON files (cheap timestamp refresh)
+SKIP_POLICY = os.environ.get("SMART_FRAME_SKIP_POLICY", "skip")
+
+
+def strip_volatile(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {k: strip_volatile(v) for k, v in obj.items() if k not in VOLATILE_KEYS}
+    if isinstance(obj, (list, tuple)):
+        return [strip_volatile(v) for v in obj]
+    return obj
+
+
+def fingerprint(bundle) -> str:
+    # bundle is the (data, weather, instagram, news, moltbot) tuple from update_data()
+    canonical = json.dumps(strip_volatile(bundle), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def last_delivered() -> Optional[str]:
+    return get_store().get("delivered", {}).get("fingerprint")
+
+
+def mark_delivered(fp: str):
+    get_store().set("delivered", {"fingerprint": fp, "delivered_at": datetime.now().isoformat(timespec="seconds")})
+
+
+def is_unchanged(fp: str) -> bool:
+    return SKIP_POLICY != "always" and fp == last_delivered()
@@ -0,0 +1,151 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Columnar view of the Open-Meteo payload.
+# The hourly and daily blocks are parsed once into NumPy arrays (times as
+# datetime64, values as float64 with NaN for gaps); slots, series, daily
+# min/max, rain windows and the next change in conditions are all array
+# operations over them, so a multi-day payload costs no per-hour Python loop.
+
+# Open-Meteo weather codes with rain (drizzle, rain, showers, thunderstorm)
+RAIN_CODES = np.array([51, 53, 55, 56, 57, 61, 63, 65, 66, 67, 80, 81, 82, 95, 96, 99])
+RAIN_PROBABILITY = 50  # % at or above which an hour counts as rainy
+
+
+def _times(values: Sequence[str], unit: str) -> np.ndarray:
+    return np.array(values, dtype=f"datetime64[{unit}]")
+
+
+def _floats(values: Sequence[Any]) -> np.ndarray:
+    return np.array(values, dtype=float)
+
+
+def to_datetime(t: np.datetime64) -> datetime:
+    return t.astype("datetime64[m]").astype(datetime)
+
+
+@lru_cache(maxsize=4)
+def condition_table(label: Callable[[int], str]) -> Tuple[np.ndarray, List[str]]:
+    # Weather code -> condition group id (codes with the same label share a group)
+    names: List[str] = []
+    table = np.zeros(100, dtype=np.int16)
+    for code in range(100):
+        name = label(code)
+        if name not in names:
+            names.append(name)
+        table[code] = names.index(name)
+    return table, names
+
+
+class Forecast:
+    def __init__(self, hourly_time: np.ndarray, hourly: Dict[str, np.ndarray],
+                 daily_time: np.ndarray, daily: Dict[str, np.ndarray]):
+        self.hourly_time = hourly_time
+        self.hourly = hourly
+        self.daily_time = daily_time
+        self.daily = daily
+
+    @classmethod
+    def from_api(cls, api: Dict[str, Any]) -> "Forecast":
+        h, d = api.get("hourly", {}), api.get("daily", {})
+        hourly = {k: _floats(v) for k, v in h.items() if k != "time"}
+        daily = {k: _times(v, "m") if k in ("sunrise", "sunset") else _floats(v)
+                 for k, v in d.items() if k != "time"}
+        return cls(_times(h.get("time", []), "m"), hourly, _times(d.get("time", []), "D"), daily)
+
+    # --- Indexing ---
+
+    def hour_index(self, now: datetime) -> Optional[int]:
+        # Index of the hour containing `now`; None when the payload does not cover it
+        t = np.datetime64(now.replace(minute=0, second=0, microsecond=0), "m")
+        i = int(np.searchsorted(self.hourly_time, t))
+        if i < len(self.hourly_time) and self.hourly_time[i] == t:
+            return i
+        return None
+
+    def day_index(self, now: datetime, offset: int = 0) -> Optional[int]:
+        # Index of today + offset days (today falls back to the first day)
+        t = np.datetime64(now.date(), "D")
+        i = int(np.searchsorted(self.daily_time, t))
+        i = (i if i < len(self.daily_time) and self.daily_time[i] == t else 0) + offset
+        return i if 0 <= i < len(self.daily_time) else None
+
+    def value(self, key: str, i: Optional[int]) -> Optional[float]:
+        col = self.hourly.get(key)
+        if col is None or i is None or not 0 <= i < len(col) or np.isnan(col[i]):
+            return None
+        return float(col[i])
+
+    def day(self, now: datetime, offset: int = 0) -> Dict[str, Any]:
+        # Daily columns for today (offset 0), tomorrow (1), ...
+        i = self.day_index(now, offset)
+        if i is None:
+            return {}
+        return {k: col[i] for k, col in self.daily.items() if i < len(col)}
+
+    # --- Derived series ---
+
+    def slots(self, now: datetime, offsets: Sequence[int], keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        # Rows `offsets` hours after now, dropping any past the end of the data
+        # (no rows when the data does not cover now)
+        i = self.hour_index(now)
+        idx = np.asarray(offsets, dtype=int) + (i or 0)
+        n = 0 if i is None else min([len(self.hourly_time)] + [len(self.hourly[k]) for k in keys if k in self.hourly])
+        idx = idx[(idx >= 0) & (idx < n)]
+        out = {k: self.hourly[k][idx] for k in keys if k in self.hourly}
+        out["time"] = self.hourly_time[idx]
+        return out
+
+    def series(self, now: datetime, key: str, hours: int = 24) -> np.ndarray:
+        # The next `hours` values of one column, starting at the current hour
+        i = self.hour_index(now)
+        if i is None:
+            return np.empty(0)
+        return self.hourly.get(key, np.empty(0))[i:i + hours]
+
+    def daily_range(self, key: str = "temperature_2m") -> Dict[str, np.ndarray]:
+        # Per-day min/max of an hourly column (NaN-aware), one reduceat pass each
+        days = self.hourly_time.astype("datetime64[D]")
+        col = self.hourly.get(key)
+        if col is None or not len(days):
+            return {"day": np.empty(0, dtype="datetime64[D]"), "min": np.empty(0), "max": np.empty(0)}
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        return {"day": days[starts], "min": np.fmin.reduceat(col, starts), "max": np.fmax.reduceat(col, starts)}
+
+    def rain_mask(self, now: datetime, hours: int = 24, threshold: float = RAIN_PROBABILITY) -> np.ndarray:
+        codes = self.series(now, "weather_code", hours)
+        mask = np.isin(codes, RAIN_CODES)
+        prob = self.series(now, "precipitation_probability", hours)
+        if len(prob) == len(mask):
+            mask |= prob >= threshold
+        return mask
+
+    def rain_windows(self, now: datetime, hours: int = 24,
+                     threshold: float = RAIN_PROBABILITY) -> List[Tuple[datetime, datetime]]:
+        # [(start, end)] of consecutive rainy hours; end is the first dry hour
+        mask = self.rain_mask(now, hours, threshold)
+        edges = np.diff(np.r_[0, mask.astype(np.int8), 0])
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        base = self.hour_index(now)
+        times = self.hourly_time
+        last = times[-1] + np.timedelta64(60, "m") if len(times) else None
+        return [(to_datetime(times[base + s]), to_datetime(times[base + e]) if base + e < len(times) else to_datetime(last))
+                for s, e in zip(starts, ends)]
+
+    def next_change(self, now: datetime, label: Callable[[int], str], hours: int = 24) -> Optional[Tuple[datetime, str]]:
+        # First hour whose condition label differs from the current hour's
+        codes = self.series(now, "weather_code", hours)
+        if len(codes) < 2 or np.isnan(codes[0]):
+            return None
+        # A missing hour counts as no change
+        codes = np.nan_to_num(codes, nan=codes[0]).astype(int)
+        table, names = condition_table(label)
+        groups = table[np.clip(codes, 0, 99)]
+        changed = np.flatnonzero(groups[1:] != groups[0])
+        if not len(changed):
+            return None
+        i = int(changed[0]) + 1
+        return to_datetime(self.hourly_time[self.hour_index(now) + i]), names[groups[i]]
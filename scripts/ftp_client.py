@@ -0,0 +1,156 @@
+import fnmatch
+import ftplib
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from tracing import count
+
+# Persistent FTP transport for the frame.
+# A FrameFTP keeps one logged-in control connection and reuses it for
+# listing, renames, uploads and deletes, instead of one lftp/curl process
+# (and one login) per operation. Dropped connections are re-opened on demand.
+# devices.py keeps one session per (host, port) across cycles.
+
+FTP_HOST = "192.168.100.12"
+FTP_PORT = "2221"
+FTP_USER = "anonymous"
+FTP_PASSWORD = ""
+FTP_TIMEOUT = 20  # seconds, per socket operation
+FTP_RETRIES = 2   # reconnect attempts per operation
+BLOCK_SIZE = 64 * 1024
+
+# Errors that mean "the session is gone", so reconnecting may help.
+# ftplib.error_perm (5xx) is a real answer from the server and is not retried.
+RECONNECT_ERRORS = (ftplib.error_temp, ftplib.error_reply, EOFError, OSError)
+
+
+class BufferReader:
+    # File-like view over an in-memory frame for storbinary(); read() hands out
+    # memoryview slices of the one buffer, so nothing is copied before the socket
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        self.view = memoryview(data).cast("B")
+        self.pos = 0
+
+    def read(self, size: int = -1) -> memoryview:
+        end = len(self.view) if size < 0 else min(self.pos + size, len(self.view))
+        chunk = self.view[self.pos:end]
+        self.pos = end
+        return chunk
+
+
+class FrameFTP:
+    def __init__(self, host: str = FTP_HOST, port: Union[int, str] = FTP_PORT,
+                 user: str = FTP_USER, password: str = FTP_PASSWORD,
+                 timeout: float = FTP_TIMEOUT, retries: int = FTP_RETRIES):
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self.retries = retries
+        self.ftp: Optional[ftplib.FTP] = None
+        self.logins = 0
+        self.ops = 0
+
+    # --- Connection ---
+
+    def connect(self):
+        self.close()
+        ftp = ftplib.FTP(timeout=self.timeout)
+        ftp.connect(self.host, self.port)
+        ftp.login(self.user, self.password)
+        ftp.voidcmd("TYPE I")
+        self.ftp = ftp
+        self.logins += 1
+        count("ftp_logins", host=self.host)
+        return ftp
+
+    def close(self):
+        if self.ftp is None:
+            return
+        try:
+            self.ftp.quit()
+        except Exception:
+            self.ftp.close()
+        self.ftp = None
+
+    def keepalive(self) -> bool:
+        # Cheap NOOP so an idle pooled session is not dropped by the frame.
+        try:
+            self._call(lambda ftp: ftp.voidcmd("NOOP"))
+            return True
+        except Exception:
+            return False
+
+    def _call(self, fn):
+        last_error: Optional[BaseException] = None
+        for attempt in range(self.retries + 1):
+            try:
+                ftp = self.ftp or self.connect()
+                result = fn(ftp)
+                self.ops += 1
+                count("ftp_operations", host=self.host)
+                return result
+            except RECONNECT_ERRORS as e:
+                last_error = e
+                count("ftp_reconnects", host=self.host)
+                print(f"FTP error ({e}), reconnecting ({attempt + 1}/{self.retries + 1})...")
+                self.close()
+                time.sleep(min(2 ** attempt * 0.5, 4))
+        raise last_error  # type: ignore[misc]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Operations ---
+
+    def list(self, pattern: Optional[str] = None) -> List[str]:
+        def _nlst(ftp):
+            try:
+                return ftp.nlst()
+            except ftplib.error_perm as e:
+                # Many servers answer 550 for an empty directory
+                if str(e).startswith("550"):
+                    return []
+                raise
+        names = [os.path.basename(n) for n in self._call(_nlst)]
+        if pattern:
+            names = [n for n in names if fnmatch.fnmatch(n, pattern)]
+        return sorted(names)
+
+    def rename(self, src: str, dst: str):
+        self._call(lambda ftp: ftp.rename(src, dst))
+
+    def delete(self, name: str):
+        self._call(lambda ftp: ftp.delete(name))
+
+    def upload(self, source: Union[str, bytes, bytearray, memoryview], remote_name: str) -> int:
+        # source is a local path or the encoded frame bytes
+        def _stor(ftp):
+            if isinstance(source, str):
+                with open(source, "rb") as f:
+                    ftp.storbinary(f"STOR {remote_name}", f, BLOCK_SIZE)
+                return os.path.getsize(source)
+            reader = BufferReader(source)
+            ftp.storbinary(f"STOR {remote_name}", reader, BLOCK_SIZE)
+            return len(reader.view)
+        return self._call(_stor)
+
+    def run_batch(self, ops: List[Tuple[Any, ...]], stop_on_error: bool = False) -> List[Dict[str, Any]]:
+        # ops: ("list", pattern) | ("rename", src, dst) | ("upload", source, name) | ("delete", name)
+        handlers = {"list": self.list, "rename": self.rename, "upload": self.upload, "delete": self.delete}
+        results = []
+        for op in ops:
+            name, args = op[0], op[1:]
+            try:
+                results.append({"op": name, "args": args, "ok": True, "result": handlers[name](*args)})
+            except Exception as e:
+                results.append({"op": name, "args": args, "ok": False, "error": str(e)})
+                if stop_on_error:
+                    break
+        return results
+
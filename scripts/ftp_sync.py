@@ -6,8 +6,6 @@ from datetime import datetime
 # Configuration
 WORKSPACE = "/Users/maxx/.openclaw/workspace"
 PROJECT_DIR = os.path.join(WORKSPACE, "projects", "smart-frame")
-FTP_HOST = "192.168.100.12"
-FTP_PORT = "2221"
 
 def sync():
     print(f"[{datetime.now()}] Starting FTP strict sync...")
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import formatdate
+from typing import Any, Dict, Optional, Tuple
+
+from fetch import HttpError
+
+# On-disk cache for JSON API responses (Open-Meteo).
+# Entries are keyed by request URL and served according to:
+#   age < ttl                  -> fresh hit, no request
+#   age < ttl + swr            -> stale hit, revalidated in the background
+#   otherwise                  -> conditional GET (ETag / Last-Modified)
+# A failed request raises, so the caller's retries apply; once they are used
+# up, get_json_stale() serves the last good payload (age < max), marked stale.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(PROJECT_DIR, ".cache", "http")
+
+DEFAULT_TTL = 30 * 60            # seconds a response is served without asking
+DEFAULT_SWR = 6 * 3600           # extra seconds it may be served while revalidating
+DEFAULT_MAX_STALE = 48 * 3600    # oldest payload served when the API is down
+
+_inflight: Dict[str, threading.Thread] = {}
+_inflight_lock = threading.Lock()
+
+
+def _path(url: str) -> str:
+    return os.path.join(CACHE_DIR, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + ".json")
+
+
+def load_entry(url: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_path(url), "r") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if entry.get("url") == url else None
+
+
+def save_entry(entry: Dict[str, Any]):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path(entry["url"])
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(entry, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _revalidate(client, url: str, entry: Optional[Dict[str, Any]], timeout: Optional[float]) -> Dict[str, Any]:
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        elif entry.get("fetched_at"):
+            headers["If-Modified-Since"] = formatdate(entry["fetched_at"], usegmt=True)
+
+    status, resp_headers, body = client.request(url, headers=headers, timeout=timeout)
+    now = time.time()
+    if status == 304 and entry:
+        entry["fetched_at"] = now
+        entry["revalidated"] = entry.get("revalidated", 0) + 1
+    elif status == 200:
+        entry = {
+            "url": url,
+            "fetched_at": now,
+            "etag": resp_headers.get("etag"),
+            "last_modified": resp_headers.get("last-modified"),
+            "revalidated": 0,
+            "payload": json.loads(body),
+        }
+    else:
+        raise HttpError(status, "", url)
+    save_entry(entry)
+    return entry
+
+
+def _revalidate_in_background(client, url: str, entry: Dict[str, Any], timeout: Optional[float]):
+    def _run():
+        try:
+            _revalidate(client, url, entry, timeout)
+        except Exception as e:
+            print(f"Background revalidation failed for {url}: {e}")
+        finally:
+            with _inflight_lock:
+                _inflight.pop(url, None)
+
+    with _inflight_lock:
+        if url in _inflight:
+            return
+        thread = _inflight[url] = threading.Thread(target=_run, name="http-cache-revalidate", daemon=True)
+    thread.start()
+
+
+def wait_for_revalidation(timeout: float = 15.0):
+    # One-shot runs call this before exiting so background refreshes still land on disk.
+    deadline = time.monotonic() + timeout
+    with _inflight_lock:
+        threads = list(_inflight.values())
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+
+def get_json_cached(client, url: str, ttl: float = DEFAULT_TTL, swr: float = DEFAULT_SWR,
+                    timeout: Optional[float] = None) -> Tuple[Any, Dict[str, Any]]:
+    # Returns (payload, meta). meta["cache"] is one of
+    # "hit", "stale-while-revalidate", "revalidated", "miss".
+    entry = load_entry(url)
+    age = time.time() - entry["fetched_at"] if entry else None
+
+    if entry and age < ttl:
+        return entry["payload"], {"cache": "hit", "stale": False, "age": age, "fetched_at": entry["fetched_at"]}
+
+    if entry and age < ttl + swr:
+        _revalidate_in_background(client, url, dict(entry), timeout)
+        return entry["payload"], {"cache": "stale-while-revalidate", "stale": False, "age": age,
+                                  "fetched_at": entry["fetched_at"]}
+
+    had_entry = entry is not None
+    entry = _revalidate(client, url, entry, timeout)
+    return entry["payload"], {"cache": "revalidated" if had_entry else "miss", "stale": False, "age": 0.0,
+                              "fetched_at": entry["fetched_at"]}
+
+
+def get_json_stale(url: str, error: Exception, max_stale: float = DEFAULT_MAX_STALE) -> Tuple[Any, Dict[str, Any]]:
+    # Last good payload for url after every attempt failed; re-raises error
+    # when there is none younger than max_stale. meta["cache"] is "stale-error".
+    entry = load_entry(url)
+    age = time.time() - entry["fetched_at"] if entry else None
+    if entry is None or age >= max_stale:
+        raise error
+    print(f"Serving cached response for {url} ({age / 60:.0f} min old): {error}")
+    return entry["payload"], {"cache": "stale-error", "stale": True, "age": age,
+                              "fetched_at": entry["fetched_at"], "error": str(error)}
@@ -0,0 +1,180 @@
+import hashlib
+import io
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from fetch import CLIENT, HttpError, fetch_all
+from state_store import get_store
+from tracing import count
+
+# Local copies of the remote images the cards reference (news photos, CDN
+# post images). Each image is downloaded once, scaled down to cover its card
+# and re-encoded, then stored content-addressed under images/cache/ (served
+# by the local render origin and published with the page). The bundle is
+# rewritten to the local path, with the original URL kept next to it as
+# "<field>_source" so later cycles can revalidate it. The cache is capped by
+# size and evicts least recently used images that no card references.
+# Downloads run concurrently through the fetch engine under one DEADLINE, so
+# a hung image host delays the update by at most that long.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_SUBDIR = "images/cache"
+IMAGE_CACHE_DIR = os.path.join(PROJECT_DIR, CACHE_SUBDIR)
+MAX_BYTES = int(os.environ.get("SMART_FRAME_IMAGE_CACHE_BYTES", str(8 * 1024 * 1024)))
+REVALIDATE_AFTER = 6 * 3600  # same-URL images (e.g. .../latest.png) can change
+FETCH_TIMEOUT = 10
+DEADLINE = float(os.environ.get("SMART_FRAME_IMAGE_DEADLINE", "12"))  # seconds for all images together
+JPEG_QUALITY = 82
+
+# (bundle section index, key path, card size in pixels); sections are in
+# update_data() order: data, weather, instagram, news, moltbot
+REFERENCES: List[Tuple[int, Tuple[str, ...], Tuple[int, int]]] = [
+    (3, ("news", "featured", "image_url"), (681, 318)),
+    (3, ("news", "secondary_1", "image_url"), (340, 160)),
+    (3, ("news", "secondary_2", "image_url"), (340, 160)),
+]
+
+
+def downscale(data: bytes, size: Tuple[int, int]) -> Tuple[bytes, str]:
+    # Smallest scale that still covers `size` (CSS background-size: cover),
+    # never upscaled; JPEG, or WebP when the image has transparency
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        scale = min(1.0, max(size[0] / img.width, size[1] / img.height))
+        if scale < 1.0:
+            img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+        buf = io.BytesIO()
+        rgba = img.convert("RGBA") if img.mode in ("RGBA", "LA", "P") else None
+        if rgba is not None and rgba.getextrema()[3][0] < 255:
+            rgba.save(buf, format="WEBP", quality=JPEG_QUALITY, method=4)
+            return buf.getvalue(), "webp"
+        img.convert("RGB").save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        return buf.getvalue(), "jpg"
+
+
+def _store(data: bytes, ext: str, cache_dir: str) -> str:
+    name = f"{hashlib.sha256(data).hexdigest()[:32]}.{ext}"
+    path = os.path.join(cache_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return name
+
+
+def fetch_image(url: str, size: Tuple[int, int], entry: Optional[Dict[str, Any]],
+                cache_dir: str = IMAGE_CACHE_DIR, client=CLIENT) -> Dict[str, Any]:
+    # Returns the index entry for url: {"file", "bytes", "source_bytes", "etag", "last_modified", "checked", "used"}
+    headers = {}
+    if entry and os.path.exists(os.path.join(cache_dir, entry["file"])):
+        if time.time() - entry["checked"] < REVALIDATE_AFTER:
+            return entry
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    else:
+        entry = None
+    status, resp_headers, body = client.request(url, headers=headers, timeout=FETCH_TIMEOUT)
+    if status == 304 and entry:
+        count("image_cache", state="revalidated")
+        return dict(entry, checked=time.time())
+    if status != 200:
+        raise HttpError(status, "", url)
+    data, ext = downscale(body, size)
+    count("image_cache", state="fetched")
+    return {"file": _store(data, ext, cache_dir), "bytes": len(data), "source_bytes": len(body),
+            "etag": resp_headers.get("etag"), "last_modified": resp_headers.get("last-modified"),
+            "checked": time.time(), "used": time.time()}
+
+
+def _lookup(section: Dict[str, Any], path: Tuple[str, ...]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    node: Any = section
+    for key in path[:-1]:
+        node = node.get(key) if isinstance(node, dict) else None
+    return (node, path[-1]) if isinstance(node, dict) else (None, None)
+
+
+def evict(index: Dict[str, Dict[str, Any]], keep: set, max_bytes: int = MAX_BYTES,
+          cache_dir: str = IMAGE_CACHE_DIR) -> int:
+    # Drops least recently used entries (never ones in `keep`) until under
+    # max_bytes, then deletes files no entry points at. Returns files removed.
+    total = sum(e["bytes"] for e in index.values())
+    for url, e in sorted(index.items(), key=lambda kv: kv[1]["used"]):
+        if total <= max_bytes:
+            break
+        if url not in keep:
+            total -= e["bytes"]
+            del index[url]
+    wanted = {e["file"] for e in index.values()}
+    removed = 0
+    try:
+        names = os.listdir(cache_dir)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if name not in wanted and not name.endswith(".tmp"):
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
+
+
+def localize(bundle: Tuple[Dict[str, Any], ...], cache_dir: Optional[str] = None, client=None) -> Dict[str, Any]:
+    # Rewrites the image references in bundle (in place) to local copies.
+    # Returns {"local", "fetched", "failed", "evicted"}; a failed image (or one
+    # still downloading at DEADLINE) keeps its cached copy or its remote URL.
+    cache_dir, client = cache_dir or IMAGE_CACHE_DIR, client or CLIENT
+    store = get_store()
+    index: Dict[str, Dict[str, Any]] = store.get("image_cache", {})
+    stats = {"local": 0, "fetched": 0, "failed": 0, "evicted": 0}
+    found = []
+    for section_index, path, size in REFERENCES:
+        node, key = _lookup(bundle[section_index], path)
+        if node is None:
+            continue
+        url = node.get(f"{key}_source") or node.get(key)
+        if url and str(url).startswith(("http://", "https://")):
+            found.append((node, key, url, size))
+    referenced = {url for _, _, url, _ in found}
+
+    def _fetch(url, size):
+        return lambda c: fetch_image(url, size, index.get(url), cache_dir, c)
+
+    sources = {url: _fetch(url, size) for _, _, url, size in found}
+    results = fetch_all(sources, client, deadlines={url: DEADLINE for url in sources}, retries=0)
+    for node, key, url, _ in found:
+        before, result = index.get(url), results[url]
+        entry = result["data"]
+        if not result["ok"]:
+            count("image_cache", state="failed")
+            stats["failed"] += 1
+            if before and os.path.exists(os.path.join(cache_dir, before["file"])):
+                # Revalidation failed: the copy we have is still better than a hot link
+                print(f"Image cache: {url} failed ({result['error']}), keeping the cached copy")
+                entry = before
+            else:
+                print(f"Image cache: {url} failed ({result['error']}), keeping the remote URL")
+                node[key], node[f"{key}_source"] = url, url
+                continue
+        stats["fetched"] += entry is not before and (before is None or entry["file"] != before["file"])
+        entry["used"] = time.time()
+        index[url] = entry
+        node[key], node[f"{key}_source"] = f"{CACHE_SUBDIR}/{entry['file']}", url
+        stats["local"] += 1
+    stats["evicted"] = evict(index, referenced, cache_dir=cache_dir)
+    store.set("image_cache", index)
+    return stats
+
+
+if __name__ == "__main__":
+    index = get_store().get("image_cache", {})
+    total = sum(e["bytes"] for e in index.values())
+    source = sum(e.get("source_bytes", 0) for e in index.values())
+    print(f"{len(index)} images, {total / 1024:.0f} KB cached (from {source / 1024:.0f} KB downloaded)")
+    for url, e in sorted(index.items(), key=lambda kv: -kv[1]["used"]):
+        print(f"  {e['file']} {e['bytes'] / 1024:.0f} KB  {url}")
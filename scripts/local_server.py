@@ -0,0 +1,103 @@
+import errno
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Local render origin for the capture scripts.
+# Serves index.html, the data files and images/ from the project directory on
+# localhost, so a capture always draws the data that was just written, with
+# no push, no Pages deploy and no internet needed. Only the files the page
+# loads are served; state.db, .cache/ and the scripts stay private.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = os.environ.get("SMART_FRAME_LOCAL_HOST", "127.0.0.1")
+PORT = int(os.environ.get("SMART_FRAME_LOCAL_PORT", "8080"))
+
+# What the page loads; update.sync_github() publishes the same set to Pages
+PAGE_FILES = ("index.html", "bundle.json", "maxx_avatar_real.png")
+PAGE_DIRS = ("images",)
+SERVED_FILES = {f"/{name}" for name in PAGE_FILES} | {
+    "/snapshot.html",
+    "/data.json", "/weather.json", "/instagram.json", "/news.json", "/moltbot.json",
+}
+SERVED_DIRS = tuple(f"/{name}/" for name in PAGE_DIRS)
+
+
+class FrameRequestHandler(SimpleHTTPRequestHandler):
+    def _allowed(self) -> bool:
+        path = self.path.split("?", 1)[0].split("#", 1)[0]
+        if path == "/":
+            return True
+        if ".." in path:
+            return False
+        return path in SERVED_FILES or path.startswith(SERVED_DIRS)
+
+    def do_GET(self):
+        if not self._allowed():
+            self.send_error(404)
+            return
+        super().do_GET()
+
+    def do_HEAD(self):
+        if not self._allowed():
+            self.send_error(404)
+            return
+        super().do_HEAD()
+
+    def end_headers(self):
+        # Data changes every cycle; never let the capture browser cache it
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host: str = HOST, port: int = PORT, directory: str = PROJECT_DIR) -> ThreadingHTTPServer:
+    handler = functools.partial(FrameRequestHandler, directory=directory)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+_SERVER: Optional[ThreadingHTTPServer] = None
+_lock = threading.Lock()
+
+
+def ensure_server(host: str = HOST, port: int = PORT, directory: str = PROJECT_DIR) -> str:
+    # Starts the server in a background thread once per process and returns
+    # its URL. If the port is taken (a standalone local_server.py is already
+    # running), that instance is used.
+    global _SERVER
+    with _lock:
+        if _SERVER is None:
+            try:
+                _SERVER = make_server(host, port, directory)
+            except OSError as e:
+                if e.errno != errno.EADDRINUSE:
+                    raise
+            else:
+                threading.Thread(target=_SERVER.serve_forever, name="local-server", daemon=True).start()
+                print(f"Local render origin on http://{host}:{port}/")
+    return f"http://{host}:{port}/"
+
+
+def stop_server():
+    global _SERVER
+    with _lock:
+        if _SERVER is not None:
+            _SERVER.shutdown()
+            _SERVER.server_close()
+            _SERVER = None
+
+
+if __name__ == "__main__":
+    server = make_server()
+    print(f"Serving {PROJECT_DIR} on http://{HOST}:{PORT}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
@@ -0,0 +1,113 @@
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import update
+from fingerprint import SKIP_POLICY, fingerprint, last_delivered, mark_delivered
+from tracing import count, span
+
+# Ahead-of-time frames for the delivery slots (:26 and :56 by default).
+# After every data refresh the queue makes sure the next AHEAD slots each have
+# a frame encoded and ready: the bundle is retargeted to the slot's time
+# (frame id, clock, hourly slots, day/night, moon) and rendered then, so at
+# the slot boundary only the upload is left. A queued frame is rebuilt only
+# when the retargeted bundle no longer matches the one it was built from,
+# i.e. fresh data changed what that slot would show.
+
+SLOT_MINUTES = [int(m) for m in os.environ.get("SMART_FRAME_SLOTS", "26,56").split(",") if m.strip()]
+AHEAD = int(os.environ.get("SMART_FRAME_PRERENDER_AHEAD", "2"))
+
+
+def next_slots(now: datetime, n: int = AHEAD, minutes: List[int] = SLOT_MINUTES) -> List[datetime]:
+    # The next n slot times strictly after now
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    out: List[datetime] = []
+    while len(out) < n:
+        out += [hour.replace(minute=m) for m in sorted(minutes) if hour.replace(minute=m) > now][:n - len(out)]
+        hour += timedelta(hours=1)
+    return out
+
+
+class PrerenderQueue:
+    def __init__(self, ahead: int = AHEAD, minutes: List[int] = SLOT_MINUTES):
+        self.ahead = ahead
+        self.minutes = minutes
+        # slot -> {"slot", "fingerprint", "frames", "devices", "built_at"}
+        self.entries: Dict[datetime, Dict[str, Any]] = {}
+
+    def next_slot(self, now: Optional[datetime] = None) -> datetime:
+        return next_slots(now or datetime.now(), 1, self.minutes)[0]
+
+    def build(self, bundle: Tuple[Dict[str, Any], ...], slot: datetime,
+              target: Optional[Tuple[Dict[str, Any], ...]] = None) -> Dict[str, Any]:
+        target = target or update.retarget_bundle(bundle, slot)
+        with span("prerender", slot=slot.strftime("%H:%M")):
+            frames, devices = update.capture_frames(target)
+        return {"slot": slot, "fingerprint": fingerprint(target), "frames": frames, "devices": devices,
+                "built_at": time.time()}
+
+    def fill(self, bundle: Tuple[Dict[str, Any], ...], now: Optional[datetime] = None) -> int:
+        # Builds or rebuilds the frames for the next slots; returns how many were built
+        now = now or datetime.now()
+        for slot in [slot for slot in self.entries if slot <= now]:
+            # Queued for a delivery retry: rendered again at the retry if the data moved on
+            if self.entries[slot]["fingerprint"] != fingerprint(update.retarget_bundle(bundle, slot)):
+                count("prerender_invalidated")
+                del self.entries[slot]
+        built = 0
+        for slot in next_slots(now, self.ahead, self.minutes):
+            target = update.retarget_bundle(bundle, slot)
+            entry = self.entries.get(slot)
+            if entry is not None and entry["fingerprint"] == fingerprint(target):
+                continue
+            if entry is not None:
+                count("prerender_invalidated")
+                print(f"Data changed, rebuilding the {slot:%H:%M} frame")
+            try:
+                self.entries[slot] = self.build(bundle, slot, target)
+                built += 1
+            except Exception as e:
+                # Left to on-demand rendering at the slot
+                print(f"Pre-render for {slot:%H:%M} failed: {e}")
+                self.entries.pop(slot, None)
+        return built
+
+    def take(self, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        # The frame for the latest slot that has started; older missed slots are dropped
+        now = now or datetime.now()
+        started = sorted(slot for slot in self.entries if slot <= now)
+        if not started:
+            return None
+        for slot in started[:-1]:
+            count("prerender_dropped")
+            del self.entries[slot]
+        return self.entries.pop(started[-1])
+
+    def put_back(self, entry: Dict[str, Any]):
+        # A failed upload stays queued for the delivery retry (unless rebuilt meanwhile)
+        self.entries.setdefault(entry["slot"], entry)
+
+
+def deliver(entry: Dict[str, Any]) -> str:
+    # Uploads a queued frame; returns "delivered", "unchanged" (skipped) or "failed"
+    late = (datetime.now() - entry["slot"]).total_seconds()
+    with span("slot", slot=entry["slot"].strftime("%H:%M"), late_s=round(late, 1)) as attrs:
+        if SKIP_POLICY != "always" and entry["fingerprint"] == last_delivered():
+            count("cycles_skipped")
+            attrs['status'] = "unchanged"
+            print(f"{entry['slot']:%H:%M} frame unchanged since last delivery, skipping upload.")
+            return attrs['status']
+        print(f"[{datetime.now()}] Delivering pre-rendered {entry['slot']:%H:%M} frame ({late:+.1f}s)...")
+        try:
+            update.upload_frames(entry["frames"], entry["devices"])
+        except Exception as e:
+            print(f"FTP Sync failed: {e}")
+            count("deliveries_failed")
+            attrs['status'] = "failed"
+        else:
+            mark_delivered(entry["fingerprint"])
+            attrs['status'] = "delivered"
+    # GitHub Pages is not on the frame's critical path; publish in the background
+    update.PUBLISHER.request()
+    return attrs['status']
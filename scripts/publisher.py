@@ -0,0 +1,80 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from tracing import attach, current
+
+# Background publishing (GitHub Pages) off the frame delivery path.
+# request() returns at once; the publish function runs in a worker thread.
+# Requests that arrive while a publish is running are coalesced into one
+# follow-up run, so a slow push never queues up a backlog. With min_interval
+# a run also waits until that long after the previous one, folding every
+# request in between into it; wait() cuts the wait short.
+
+
+class Publisher:
+    def __init__(self, publish: Callable[[], None], name: str = "publisher", min_interval: float = 0.0):
+        self.publish = publish
+        self.name = name
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._pending = False
+        self._hurry = threading.Event()
+        self._last_run: Optional[float] = None
+        # Span of the latest request; the publish shows up inside that cycle's trace
+        self._context: Optional[Dict[str, Any]] = None
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_published: Optional[datetime] = None
+
+    def request(self):
+        with self._lock:
+            self._pending = True
+            self._context = current()
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+            if self._last_run is not None:
+                self._hurry.wait(self._last_run + self.min_interval - time.monotonic())
+            with self._lock:
+                self._pending = False
+                context = self._context
+            try:
+                with attach(context):
+                    self.publish()
+                self.last_published = datetime.now()
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"Publish failed: {e}")
+            self.runs += 1
+            self._last_run = time.monotonic()
+
+    def wait(self, timeout: float = 120.0) -> bool:
+        # One-shot runs call this before exiting; returns False if still busy
+        deadline = time.monotonic() + timeout
+        self._hurry.set()
+        try:
+            while True:
+                with self._lock:
+                    thread = self._thread
+                if thread is None:
+                    return True
+                thread.join(max(0.0, deadline - time.monotonic()))
+                if thread.is_alive():
+                    return False
+        finally:
+            # A timed-out wait must not leave later requests skipping min_interval
+            self._hurry.clear()
@@ -0,0 +1,658 @@
+import functools
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from fingerprint import strip_volatile
+
+# Native (in-process) renderer for the dashboard.
+# Mirrors the bento layout of index.html so a frame can be produced straight
+# from the dicts returned by update_data(), without GitHub Pages or Chromium.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGES_DIR = os.path.join(PROJECT_DIR, "images")
+AVATAR_FILE = os.path.join(PROJECT_DIR, "maxx_avatar_real.png")
+
+WIDTH, HEIGHT = 1024, 640
+GAP = 4
+PAGE_BG = (8, 11, 16)
+
+# First match wins. macOS paths first (production box), then common Linux fonts.
+FONT_CANDIDATES = {
+    "regular": [
+        "/System/Library/Fonts/Supplemental/Arial.ttf",
+        "/Library/Fonts/Inter-Regular.ttf",
+        "/usr/share/fonts/truetype/inter/Inter-Regular.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    ],
+    "bold": [
+        "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
+        "/Library/Fonts/Inter-Bold.ttf",
+        "/usr/share/fonts/truetype/inter/Inter-Bold.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    ],
+    "black": [
+        "/System/Library/Fonts/Supplemental/Arial Black.ttf",
+        "/Library/Fonts/Inter-Black.ttf",
+        "/usr/share/fonts/truetype/inter/Inter-Black.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    ],
+    "mono": [
+        "/System/Library/Fonts/Supplemental/Courier New Bold.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSansMono-Bold.ttf",
+    ],
+}
+EMOJI_FONT_CANDIDATES = [
+    ("/System/Library/Fonts/Apple Color Emoji.ttc", 160),
+    ("/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf", 109),
+    ("/usr/share/fonts/noto/NotoColorEmoji.ttf", 109),
+]
+
+# Overlay gradients of .w-over, keyed by data-theme (see index.html)
+WEATHER_OVERLAYS = {
+    "default": [(0.0, 0.4), (0.4, 0.2), (1.0, 0.8)],
+    "night": [(0.0, 0.5), (0.4, 0.3), (1.0, 0.9)],
+}
+
+RED = (220, 38, 38)
+CYAN = (34, 211, 238)
+
+
+# --- Fonts ---
+
+@functools.lru_cache(maxsize=None)
+def font(kind: str, size: int):
+    for path in FONT_CANDIDATES.get(kind, []):
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size)
+
+
+@functools.lru_cache(maxsize=None)
+def _emoji_font():
+    for path, size in EMOJI_FONT_CANDIDATES:
+        if os.path.exists(path):
+            try:
+                return ImageFont.truetype(path, size), size
+            except OSError:
+                continue
+    return None, 0
+
+
+@functools.lru_cache(maxsize=256)
+def _emoji_image(char: str, size: int):
+    # Color emoji fonts only ship fixed bitmap strikes, so draw at the native
+    # strike size and scale down to the requested CSS font-size.
+    efont, native = _emoji_font()
+    if efont is None:
+        return None
+    tile = Image.new("RGBA", (native * 2, native * 2), (0, 0, 0, 0))
+    ImageDraw.Draw(tile).text((0, 0), char, font=efont, embedded_color=True)
+    bbox = tile.getbbox()
+    if not bbox:
+        return None
+    tile = tile.crop(bbox)
+    scale = size / native
+    return tile.resize((max(1, round(tile.width * scale)), max(1, round(tile.height * scale))), Image.LANCZOS)
+
+
+# --- Drawing helpers ---
+
+def _rgba(color, alpha: float = 1.0) -> Tuple[int, int, int, int]:
+    return (color[0], color[1], color[2], round(255 * alpha))
+
+
+def grid_box(col: int, span: int, row: int) -> Tuple[int, int, int, int]:
+    # CSS: grid-template-columns: repeat(6, 1fr); grid-template-rows: 1fr 1fr; gap: 4px
+    col_w = (WIDTH - 5 * GAP) / 6
+    row_h = (HEIGHT - GAP) / 2
+    x0 = col * (col_w + GAP)
+    x1 = x0 + span * col_w + (span - 1) * GAP
+    y0 = row * (row_h + GAP)
+    return round(x0), round(y0), round(x1), round(y0 + row_h)
+
+
+def vertical_gradient(size: Tuple[int, int], stops: List[Tuple[float, Tuple[int, int, int, int]]]) -> Image.Image:
+    w, h = size
+    column = Image.new("RGBA", (1, h))
+    px = column.load()
+    for y in range(h):
+        t = y / max(1, h - 1)
+        for i in range(len(stops) - 1):
+            p0, c0 = stops[i]
+            p1, c1 = stops[i + 1]
+            if t <= p1 or i == len(stops) - 2:
+                f = 0.0 if p1 == p0 else min(1.0, max(0.0, (t - p0) / (p1 - p0)))
+                px[0, y] = tuple(round(a + (b - a) * f) for a, b in zip(c0, c1))
+                break
+    return column.resize((w, h))
+
+
+def cover(image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    # background-size: cover; background-position: center
+    w, h = size
+    scale = max(w / image.width, h / image.height)
+    resized = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+    left = (resized.width - w) // 2
+    top = (resized.height - h) // 2
+    return resized.crop((left, top, left + w, top + h))
+
+
+def overlay_box(img: Image.Image, box, fill=None, outline=None, radius: int = 0, width: int = 1):
+    # Cards are RGB, so an "RGBA" draw blends translucent fills like CSS rgba() does.
+    ImageDraw.Draw(img, "RGBA").rounded_rectangle(box, radius=radius, fill=fill, outline=outline, width=width)
+
+
+def text_width(text: str, fnt) -> float:
+    return fnt.getlength(text)
+
+
+def draw_text(img: Image.Image, xy, text: str, fnt, fill, anchor: str = "la"):
+    if len(fill) == 3 or fill[3] == 255:
+        ImageDraw.Draw(img).text(xy, text, font=fnt, fill=fill[:3], anchor=anchor)
+        return
+    # Glyph coverage replaces the ink alpha, so translucent text is drawn on a
+    # small layer the size of its bounding box and pasted through its own mask.
+    left, top, right, bottom = (int(v) for v in ImageDraw.Draw(img).textbbox(xy, text, font=fnt, anchor=anchor))
+    if right <= left or bottom <= top:
+        return
+    layer = Image.new("RGBA", (right - left + 1, bottom - top + 1), fill[:3] + (0,))
+    ImageDraw.Draw(layer).text((xy[0] - left, xy[1] - top), text, font=fnt, fill=fill, anchor=anchor)
+    img.paste(layer, (left, top), layer)
+
+
+def draw_emoji(img: Image.Image, xy, char: str, size: int, fallback_font=None, fill=(255, 255, 255, 255)):
+    # xy is the top-left corner of a size x size box; the glyph is centered in it.
+    tile = _emoji_image(char, size)
+    if tile is None:
+        draw_text(img, (xy[0] + size / 2, xy[1] + size / 2), char, fallback_font or font("regular", size), fill, anchor="mm")
+        return
+    x = round(xy[0] + (size - tile.width) / 2)
+    y = round(xy[1] + (size - tile.height) / 2)
+    img.paste(tile, (x, y), tile)
+
+
+def wrap(text: str, fnt, max_width: float, max_lines: int) -> List[str]:
+    # Word wrap with an ellipsis on the last line (-webkit-line-clamp)
+    words = (text or "").split()
+    lines: List[str] = []
+    current = ""
+    for word in words:
+        candidate = f"{current} {word}".strip()
+        if text_width(candidate, fnt) <= max_width or not current:
+            current = candidate
+        else:
+            lines.append(current)
+            current = word
+    if current:
+        lines.append(current)
+    if len(lines) > max_lines:
+        last = lines[max_lines - 1]
+        while last and text_width(last + "…", fnt) > max_width:
+            last = last[:-1]
+        lines = lines[:max_lines - 1] + [last.rstrip() + "…"]
+    return lines
+
+
+def _s(value: Any, default: str = "") -> str:
+    return default if value is None else str(value)
+
+
+# --- Panels ---
+
+def _weather_meta_x(w: Dict[str, Any], pad_x: int = 20) -> float:
+    temp = _s(w.get("temp_c"), "--")
+    return pad_x + text_width(temp, font("black", 110)) + 6 + 40
+
+
+def draw_weather(img: Image.Image, box, w: Dict[str, Any], clock: bool = True):
+    x0, y0, x1, y1 = box
+    cw, ch = x1 - x0, y1 - y0
+    card = Image.new("RGBA", (cw, ch), PAGE_BG + (255,))
+    bg_path = os.path.join(PROJECT_DIR, w.get("bg_image") or "images/weather_sunny.png")
+    if os.path.exists(bg_path):
+        with Image.open(bg_path) as bg:
+            card.paste(cover(bg.convert("RGB"), (cw, ch)))
+
+    overlay = WEATHER_OVERLAYS["night" if w.get("theme") == "night" else "default"]
+    card.alpha_composite(vertical_gradient((cw, ch), [(p, (0, 0, 0, round(255 * a))) for p, a in overlay]))
+    card = card.convert("RGB")
+
+    white = (255, 255, 255, 255)
+    pad_x, pad_top, pad_bottom = 20, 10, 8
+
+    # Top row: location + condition, big icon on the right
+    y = pad_top
+    location = _s(w.get("location"))
+    if location:
+        draw_text(card, (pad_x, y), location, font("black", 32), white)
+        y += 38
+    draw_text(card, (pad_x, y + 2), _s(w.get("condition")), font("regular", 20), _rgba((255, 255, 255), 0.95))
+    draw_emoji(card, (cw - pad_x - 80, pad_top - 4), _s(w.get("icon"), "🌤️"), 72)
+
+    # Hero: temperature, degree mark and meta column
+    hero_y = 80
+    temp = _s(w.get("temp_c"), "--")
+    temp_font = font("black", 110)
+    draw_text(card, (pad_x, hero_y), temp, temp_font, white)
+    meta_x = _weather_meta_x(w, pad_x)
+    draw_text(card, (meta_x - 40, hero_y - 6), "°", font("regular", 56), _rgba((255, 255, 255), 0.6))
+    draw_text(card, (meta_x, hero_y + 38), f"Sensación {_s(w.get('feels_like_c') or w.get('temp_c'))}°", font("bold", 24), _rgba((255, 255, 255), 0.9))
+    draw_text(card, (meta_x, hero_y + 68), f"↑ {_s(w.get('max_temp_c'))}° ↓ {_s(w.get('min_temp_c'))}°", font("bold", 18), _rgba((255, 255, 255), 0.8))
+    if clock:
+        draw_weather_clock(card, (0, 0, cw, ch), w)
+
+    # Bottom left: 2x2 chips
+    chips = [
+        ("VIENTO", f"{_s(w.get('wind_kmh'))} km/h"),
+        ("HUMEDAD", f"{_s(w.get('humidity'))}%"),
+        ("UV", _s(w.get("uv_index"))),
+        ("LLUVIA", f"{_s(w.get('prob_rain'))}%"),
+    ]
+    chip_w, chip_h = 88, 44
+    chips_w, chips_h = chip_w * 2 + 4 + 16, chip_h * 2 + 4 + 16
+    cx0, cy0 = pad_x, ch - pad_bottom - chips_h
+    overlay_box(card, (cx0, cy0, cx0 + chips_w, cy0 + chips_h), fill=(0, 0, 0, 77), outline=(255, 255, 255, 26), radius=12)
+    for i, (label, value) in enumerate(chips):
+        col, row = i % 2, i // 2
+        x = cx0 + 8 + col * (chip_w + 4) + 8
+        yy = cy0 + 8 + row * (chip_h + 4) + 5
+        draw_text(card, (x, yy), label, font("bold", 10), _rgba((255, 255, 255), 0.6))
+        draw_text(card, (x, yy + 14), value, font("black", 18), white)
+
+    # Bottom right: hourly forecast pills
+    hourly = w.get("hourly_forecast") or []
+    hr_w, hr_h = 55, 70
+    hx = cw - pad_x - len(hourly) * hr_w - max(0, len(hourly) - 1) * 4
+    hy = ch - pad_bottom - hr_h
+    # Between them: tomorrow, the next 24 h of temperatures, rain / next change
+    draw_weather_outlook(card, (cx0 + chips_w + 12, cy0, hx - 12, ch - pad_bottom), w)
+    for slot in hourly:
+        overlay_box(card, (hx, hy, hx + hr_w, hy + hr_h), fill=(255, 255, 255, 31), outline=(255, 255, 255, 38), radius=12)
+        draw_text(card, (hx + hr_w / 2, hy + 8), _s(slot.get("time")), font("bold", 12), _rgba((255, 255, 255), 0.7), anchor="mt")
+        draw_emoji(card, (hx + (hr_w - 20) / 2, hy + 25), _s(slot.get("icon")), 20)
+        draw_text(card, (hx + hr_w / 2, hy + hr_h - 8), f"{_s(slot.get('temp'))}°", font("black", 18), white, anchor="mb")
+        hx += hr_w + 4
+
+    img.paste(card, (x0, y0))
+
+
+def weather_note(w: Dict[str, Any]) -> Tuple[str, str]:
+    # (icon, text): the first rain window, else the next change in conditions
+    rain, change = w.get("rain_window"), w.get("next_change")
+    if rain:
+        return "☔", f"{rain['start']}–{rain['end']}"
+    if change:
+        return "", f"{change['time']} {change['condition']}".upper()
+    return "", ""
+
+
+def draw_weather_outlook(img: Image.Image, box, w: Dict[str, Any]):
+    # CSS .w-outlook: label, tomorrow's icon and range, 24 h curve, note at the bottom
+    x0, y0, x1, y1 = box
+    width = x1 - x0
+    if width < 40:
+        return
+    white = (255, 255, 255, 255)
+    tomorrow = w.get("tomorrow")
+    if tomorrow:
+        draw_text(img, (x0, y0 + 5), "MAÑANA", font("bold", 10), _rgba((255, 255, 255), 0.6))
+        draw_emoji(img, (x0, y0 + 19), _s(tomorrow.get("icon")), 16)
+        draw_text(img, (x0 + 20, y0 + 19), f"{_s(tomorrow.get('max'))}°/{_s(tomorrow.get('min'))}°", font("black", 16), white)
+    curve = w.get("temp_curve") or []
+    if len(curve) > 1:
+        lo, hi = min(curve), max(curve)
+        top, height = y0 + 46, 40
+        points = [(x0 + width * i / (len(curve) - 1), top + height * (hi - t) / ((hi - lo) or 1))
+                  for i, t in enumerate(curve)]
+        ImageDraw.Draw(img, "RGBA").line(points, fill=_rgba((255, 255, 255), 0.8), width=2, joint="curve")
+    icon, note = weather_note(w)
+    if icon:
+        draw_emoji(img, (x0, y1 - 13), icon, 12)
+    if note:
+        fnt, nx = font("bold", 10), x0 + (16 if icon else 0)
+        if text_width(note, fnt) > x1 - nx:
+            # text-overflow: ellipsis
+            while note and text_width(note + "…", fnt) > x1 - nx:
+                note = note[:-1]
+            note = note.rstrip() + "…"
+        draw_text(img, (nx, y1 - 12), note, fnt, _rgba((255, 255, 255), 0.7))
+
+
+def draw_weather_clock(img: Image.Image, box, w: Dict[str, Any]):
+    # "Updated" line, drawn separately so cached weather tiles survive the clock
+    updated = f"{_s(w.get('stale_since'))} · CACHE" if w.get("stale") else _s(w.get("last_updated"), "--:--")
+    draw_text(img, (box[0] + _weather_meta_x(w), box[1] + 80 + 94), f"UPDATED: {updated}", font("bold", 10), _rgba((255, 255, 255), 0.3))
+
+
+def draw_moltbot(img: Image.Image, box, status: Dict[str, Any], mb: Dict[str, Any], clock: bool = True):
+    x0, y0, x1, y1 = box
+    cw, ch = x1 - x0, y1 - y0
+    card = vertical_gradient((cw, ch), [(0.0, (26, 5, 5, 255)), (0.6, (0, 0, 0, 255)), (1.0, (26, 5, 5, 255))]).convert("RGB")
+    ImageDraw.Draw(card).rectangle((0, 0, 3, ch), fill=RED)
+
+    system = mb.get("system", {})
+    ops = mb.get("operations", {})
+    state = mb.get("state", {})
+    pad_x, pad_top = 28, 24
+
+    # Header
+    draw_text(card, (pad_x, pad_top), "O P E N C L A W   A G E N T", font("mono", 12), _rgba(RED, 0.8))
+    draw_text(card, (cw - pad_x, pad_top), _s(status.get("date")), font("mono", 13), (239, 68, 68, 255), anchor="ra")
+
+    # Avatar ring
+    ring = 150
+    rx, ry = pad_x, 52
+    d = ImageDraw.Draw(card)
+    d.ellipse((rx - 4, ry - 4, rx + ring + 4, ry + ring + 4), fill=(220, 38, 38, 255))
+    d.ellipse((rx + 3, ry + 3, rx + ring - 3, ry + ring - 3), fill=(0, 0, 0, 255))
+    inner = ring - 12
+    if os.path.exists(AVATAR_FILE):
+        with Image.open(AVATAR_FILE) as avatar:
+            face = cover(avatar.convert("RGBA"), (inner, inner)).transpose(Image.FLIP_LEFT_RIGHT)
+        mask = Image.new("L", (inner, inner), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, inner, inner), fill=255)
+        card.paste(face, (rx + 6, ry + 6), mask)
+    else:
+        d.ellipse((rx + 6, ry + 6, rx + 6 + inner, ry + 6 + inner), fill=(13, 20, 32, 255))
+
+    # Info column
+    ix = rx + ring + 24
+    draw_text(card, (ix, ry + 10), _s(status.get("label"), "Maxx Moltbot"), font("black", 28), (255, 255, 255, 255))
+    sub = f"{_s(system.get('current_model'))} · {_s(state.get('logic_mode'))}"
+    draw_text(card, (ix, ry + 46), sub, font("mono", 12), _rgba((255, 255, 255), 0.6))
+    mood_lines = wrap(_s(state.get("system_mood")), font("mono", 13), cw - ix - pad_x - 64, 3)
+    mood_h = 14 + 18 * len(mood_lines)
+    overlay_box(card, (ix, ry + 70, cw - pad_x, ry + 70 + mood_h), fill=_rgba(RED, 0.15), outline=_rgba(RED, 0.4), radius=6)
+    for i, line in enumerate(mood_lines):
+        draw_text(card, (ix + 14, ry + 77 + i * 18), line, font("mono", 13), (255, 255, 255, 255))
+    if clock:
+        draw_moltbot_clock(card, (0, 0, cw, ch), mb)
+
+    # Context bar + tokens
+    by = 212
+    ctx = _s(system.get("context_usage"), "0%")
+    draw_text(card, (pad_x, by), "CONTEXTO", font("mono", 11), _rgba(RED, 0.8))
+    draw_text(card, (cw - pad_x, by), ctx, font("mono", 11), _rgba(RED, 0.8), anchor="ra")
+    try:
+        pct = max(0.0, min(100.0, float(ctx.rstrip("%")))) / 100
+    except ValueError:
+        pct = 0.0
+    overlay_box(card, (pad_x, by + 18, cw - pad_x, by + 26), fill=(255, 255, 255, 26), radius=2)
+    if pct > 0:
+        overlay_box(card, (pad_x, by + 18, pad_x + round((cw - 2 * pad_x) * pct), by + 26), fill=RED + (255,), radius=2)
+    draw_text(card, (pad_x, by + 34), f"{_s(system.get('token_usage_daily'))} tokens", font("mono", 11), _rgba((255, 255, 255), 0.5))
+
+    # Operations pills
+    px, py = pad_x, ch - 20 - 26
+    pills = [
+        (f"Goal: {_s(ops.get('daily_goal_progress'))}", RED, (255, 255, 255), True),
+        (f"ETA: {_s(ops.get('next_post_eta'))}", RED, (255, 255, 255), True),
+        (_s(state.get("last_action")), (139, 92, 246), (139, 92, 246), False),
+    ]
+    pill_font = font("mono", 11)
+    for label, border, color, dot in pills:
+        w = text_width(label, pill_font) + 24 + (12 if dot else 0)
+        if px + w > cw - pad_x:
+            break
+        overlay_box(card, (px, py, px + w, py + 26), fill=(20, 0, 0, 204), outline=_rgba(border, 0.6 if dot else 0.3), radius=6)
+        tx = px + 12
+        if dot:
+            ImageDraw.Draw(card).ellipse((tx, py + 10, tx + 6, py + 16), fill=RED + (255,))
+            tx += 12
+        draw_text(card, (tx, py + 13), label, pill_font, _rgba(color, 1.0 if dot else 0.8), anchor="lm")
+        px += w + 8
+
+    img.paste(card, (x0, y0))
+
+
+def draw_moltbot_clock(img: Image.Image, box, mb: Dict[str, Any]):
+    # Last post time in the mood box (same position as in draw_moltbot)
+    stamp = _s(mb.get("operations", {}).get("last_post_timestamp"))
+    draw_text(img, (box[2] - 28 - 10, box[1] + 52 + 77), stamp, font("mono", 10), _rgba(RED, 0.8), anchor="ra")
+
+
+def draw_instagram(img: Image.Image, box, ig: Dict[str, Any]):
+    x0, y0, x1, y1 = box
+    cw, ch = x1 - x0, y1 - y0
+    card = vertical_gradient((cw, ch), [(0.0, (13, 18, 24, 255)), (1.0, (18, 16, 31, 255))]).convert("RGB")
+    pad_x, pad_top, pad_bottom = 26, 20, 16
+    white = (255, 255, 255, 255)
+
+    # Logo + handle
+    logo = vertical_gradient((28, 28), [(0.0, (240, 148, 51, 255)), (0.5, (220, 39, 67, 255)), (1.0, (188, 24, 136, 255))])
+    mask = Image.new("L", (28, 28), 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, 27, 27), radius=7, fill=255)
+    card.paste(logo, (pad_x, pad_top), mask)
+    d = ImageDraw.Draw(card)
+    d.rounded_rectangle((pad_x + 7, pad_top + 7, pad_x + 21, pad_top + 21), radius=3, outline=white, width=2)
+    d.ellipse((pad_x + 11, pad_top + 11, pad_x + 17, pad_top + 17), outline=white, width=1)
+    draw_text(card, (pad_x + 38, pad_top + 14), _s(ig.get("username")), font("bold", 14), _rgba((255, 255, 255), 0.7), anchor="lm")
+
+    # Followers
+    my = ch // 2 - 40
+    draw_text(card, (pad_x, my), "SEGUIDORES", font("bold", 10), _rgba((255, 255, 255), 0.2))
+    count = _s(ig.get("followers"))
+    count_font = font("black", 64)
+    draw_text(card, (pad_x, my + 16), count, count_font, white)
+    growth = _s(ig.get("growth"))
+    if growth:
+        gx = pad_x + text_width(count, count_font) + 14
+        gw = text_width(growth, font("black", 12)) + 20
+        overlay_box(card, (gx, my + 52, gx + gw, my + 74), fill=(74, 222, 128, 26), outline=(74, 222, 128, 38), radius=11)
+        draw_text(card, (gx + 10, my + 63), growth, font("black", 12), (110, 231, 90, 255), anchor="lm")
+
+    # Stat pills
+    pills = [(_s(ig.get("posts")), "POSTS"), (_s(ig.get("engagement_rate")), "ENGAGEMENT")]
+    pw = (cw - 2 * pad_x - 6) / 2
+    py = ch - pad_bottom - 56
+    for i, (value, label) in enumerate(pills):
+        px = pad_x + i * (pw + 6)
+        overlay_box(card, (px, py, px + pw, py + 56), fill=(255, 255, 255, 8), outline=(255, 255, 255, 13), radius=10)
+        draw_text(card, (px + pw / 2, py + 10), value, font("black", 18), white, anchor="mt")
+        draw_text(card, (px + pw / 2, py + 36), label, font("regular", 8), _rgba((255, 255, 255), 0.2), anchor="mt")
+
+    img.paste(card, (x0, y0))
+
+
+def draw_news(img: Image.Image, box, n: Dict[str, Any], background: Optional[Image.Image] = None):
+    x0, y0, x1, y1 = box
+    cw, ch = x1 - x0, y1 - y0
+    card = Image.new("RGBA", (cw, ch), PAGE_BG + (255,))
+    if background is not None:
+        card.paste(cover(background.convert("RGB"), (cw, ch)))
+    # .n-grad (0deg, so darkest at the bottom)
+    card.alpha_composite(vertical_gradient((cw, ch), [
+        (0.0, (8, 11, 16, 102)), (0.4, (8, 11, 16, 230)), (0.85, (8, 11, 16, 255)), (1.0, (8, 11, 16, 255)),
+    ]))
+    card = card.convert("RGB")
+    ImageDraw.Draw(card).rectangle((0, 0, 3, ch), fill=(6, 182, 212))
+
+    featured = n.get("featured") or {}
+    pad_x, pad_top = 34, 24
+    max_w = cw - pad_x - 30
+
+    # Tag pill
+    tag = _s(featured.get("tag"), "AI News").upper()
+    tag_font = font("mono", 11)
+    tw = text_width(tag, tag_font) + 44
+    overlay_box(card, (pad_x, pad_top, pad_x + tw, pad_top + 26), fill=(6, 182, 212, 51), outline=(6, 182, 212, 128), radius=6)
+    ImageDraw.Draw(card).ellipse((pad_x + 14, pad_top + 9, pad_x + 22, pad_top + 17), fill=CYAN + (255,))
+    draw_text(card, (pad_x + 30, pad_top + 13), tag, tag_font, CYAN + (255,), anchor="lm")
+
+    # Featured headline + source
+    y = pad_top + 36
+    head_font = font("black", 32)
+    for line in wrap(_s(featured.get("headline"), "No headlines available"), head_font, max_w, 3):
+        draw_text(card, (pad_x, y), line, head_font, (255, 255, 255, 255))
+        y += 35
+    draw_text(card, (pad_x, y + 6), _s(featured.get("source"), "Unknown").upper(), font("mono", 13), (103, 232, 249, 255))
+    y += 36
+
+    # Secondary column
+    sec_font = font("bold", 18)
+    for key in ("secondary_1", "secondary_2"):
+        story = n.get(key)
+        if not story:
+            continue
+        lines = wrap(_s(story.get("headline")), sec_font, max_w, 2)
+        needed = 12 + 22 * len(lines) + 18
+        if y + needed > ch - 8:
+            break
+        ImageDraw.Draw(card).line((pad_x, y, cw - 30, y), fill=(6, 182, 212, 51), width=1)
+        y += 12
+        for line in lines:
+            draw_text(card, (pad_x, y), line, sec_font, _rgba((255, 255, 255), 0.9))
+            y += 22
+        draw_text(card, (pad_x, y + 2), _s(story.get("source")).upper(), font("mono", 11), CYAN + (255,))
+        y += 30
+
+    img.paste(card, (x0, y0))
+
+
+# --- Tile cache ---
+# Each card is rendered once per distinct input and kept as a tile (in memory,
+# and on disk for one-shot runs). A frame is the composite of the cached
+# tiles plus the clock overlays, so only panels whose data changed are drawn.
+
+TILE_CACHE_DIR = os.path.join(PROJECT_DIR, ".cache", "tiles")
+TILE_VERSION = 1           # bump when panel drawing code changes
+TILE_MEMORY_SLOTS = 16
+TILE_DISK_MAX_FILES = 200
+
+_tiles: "OrderedDict[str, Image.Image]" = OrderedDict()
+last_render: Dict[str, Any] = {}
+
+
+def _tile_key(name: str, size: Tuple[int, int], inputs: Any) -> str:
+    canonical = json.dumps([TILE_VERSION, name, size, inputs], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return f"{name}-{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:24]}"
+
+
+def _prune_tile_dir():
+    try:
+        files = [os.path.join(TILE_CACHE_DIR, f) for f in os.listdir(TILE_CACHE_DIR) if f.endswith(".png")]
+    except OSError:
+        return
+    if len(files) <= TILE_DISK_MAX_FILES:
+        return
+    files.sort(key=os.path.getmtime)
+    for path in files[:len(files) - TILE_DISK_MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cached_tile(name: str, box, inputs: Any, draw) -> Tuple[Image.Image, bool]:
+    # Returns (tile, hit). draw(canvas, box) paints the card onto a blank canvas.
+    size = (box[2] - box[0], box[3] - box[1])
+    key = _tile_key(name, size, inputs)
+    tile = _tiles.get(key)
+    if tile is not None:
+        _tiles.move_to_end(key)
+        return tile, True
+
+    path = os.path.join(TILE_CACHE_DIR, key + ".png")
+    hit = False
+    if os.path.exists(path):
+        try:
+            with Image.open(path) as f:
+                tile = f.convert("RGB")
+            os.utime(path)
+            hit = True
+        except OSError:
+            tile = None
+    if tile is None:
+        tile = Image.new("RGB", size, PAGE_BG)
+        draw(tile, (0, 0, size[0], size[1]))
+        try:
+            os.makedirs(TILE_CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            tile.save(tmp, format="PNG", compress_level=1)
+            os.replace(tmp, path)
+            _prune_tile_dir()
+        except OSError:
+            pass
+
+    _tiles[key] = tile
+    while len(_tiles) > TILE_MEMORY_SLOTS:
+        _tiles.popitem(last=False)
+    return tile, hit
+
+
+# --- Frame ---
+
+def _local_image(rel_path: Optional[str]) -> Optional[Image.Image]:
+    # Card images localized by image_cache are project-relative paths; remote URLs are skipped
+    if not rel_path or "://" in rel_path:
+        return None
+    path = os.path.join(PROJECT_DIR, rel_path)
+    if not os.path.exists(path):
+        return None
+    with Image.open(path) as im:
+        im.load()
+        return im
+
+
+def render_frame(data: Dict[str, Any], weather_data: Dict[str, Any], ig_data: Dict[str, Any],
+                 news_data: Dict[str, Any], moltbot_data: Dict[str, Any]) -> Image.Image:
+    start = time.perf_counter()
+    status = data.get("maxx_status", {})
+    w = weather_data.get("weather", {})
+    mb = moltbot_data.get("moltbot", {})
+    ig = ig_data.get("instagram", {})
+    n = news_data.get("news", {})
+    img = Image.new("RGB", (WIDTH, HEIGHT), PAGE_BG)
+
+    # name -> (grid box, tile inputs without clock fields, draw into canvas)
+    panels = {
+        "weather": (grid_box(0, 3, 0), strip_volatile(w),
+                    lambda canvas, box: draw_weather(canvas, box, w, clock=False)),
+        "moltbot": (grid_box(3, 3, 0), strip_volatile([status.get("date"), status.get("label"), mb]),
+                    lambda canvas, box: draw_moltbot(canvas, box, status, mb, clock=False)),
+        "instagram": (grid_box(0, 2, 1), strip_volatile(ig),
+                      lambda canvas, box: draw_instagram(canvas, box, ig)),
+        "news": (grid_box(2, 4, 1), strip_volatile(n),
+                 lambda canvas, box: draw_news(canvas, box, n, background=_local_image((n.get("featured") or {}).get("image_url")))),
+    }
+    dirty = []
+    for name, (box, inputs, draw) in panels.items():
+        tile, hit = cached_tile(name, box, inputs, draw)
+        if not hit:
+            dirty.append(name)
+        img.paste(tile, box[:2])
+
+    # Clock overlays on top of the composited tiles
+    draw_weather_clock(img, panels["weather"][0], w)
+    draw_moltbot_clock(img, panels["moltbot"][0], mb)
+    fid = f"FID: {_s(status.get('frame_id'))}"
+    draw_text(img, (WIDTH - 10, HEIGHT - 4), fid, font("mono", 8), (255, 255, 255, 51), anchor="rd")
+
+    last_render.clear()
+    last_render.update({"dirty": dirty, "ms": (time.perf_counter() - start) * 1000})
+    return img
+
+
+def render_to_file(bundle, out_path: str) -> str:
+    # bundle is the (data, weather, instagram, news, moltbot) tuple from update_data()
+    img = render_frame(*bundle)
+    img.save(out_path, format="PNG", optimize=True)
+    return out_path
+
+
+if __name__ == "__main__":
+    import sys
+
+    from bundle import load_any
+
+    out = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PROJECT_DIR, "Dashboard_Latest.png")
+    bundle = load_any()
+    start = time.time()
+    render_to_file(bundle, out)
+    print(f"Rendered {out} in {(time.time() - start) * 1000:.0f} ms")
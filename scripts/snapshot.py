@@ -0,0 +1,268 @@
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Baked HTML snapshots of the dashboard.
+# index.html is parsed once into a precompiled template: static chunks of the
+# page with slots for every element go() fills in. bake() pours the bundle
+# values into those slots and writes snapshot.html, a static page with the
+# data inlined, no fetches and no DOM building, which the capture can
+# screenshot as soon as images and fonts are in. index.html itself is never
+# modified. The compiled template is cached on disk by the page's hash.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HTML_FILE = os.path.join(PROJECT_DIR, "index.html")
+SNAPSHOT_FILE = os.path.join(PROJECT_DIR, "snapshot.html")
+TEMPLATE_CACHE = os.path.join(PROJECT_DIR, ".cache", "template.json")
+TEMPLATE_VERSION = 1
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+# Element id -> what go() sets on it: "text" / "html" replace the content,
+# "style" / "attrs" rewrite the start tag
+BOUND: Dict[str, str] = {
+    "w-loc": "text", "w-cond": "text", "w-temp": "text", "w-feels": "text", "w-mm": "text",
+    "w-wind": "text", "w-hum": "text", "w-uv": "text", "w-prob": "text", "w-icon": "text",
+    "w-updated": "text", "frame-id": "text", "w-bg": "style", "card-weather": "attrs", "w-hourly": "html",
+    "w-tmrw-l": "text", "w-tmrw": "text", "w-curve": "attrs", "w-note": "text",
+    "ig-user": "text", "ig-foll": "text", "ig-grow": "text", "ig-posts": "text",
+    "m-label": "text", "m-sub": "text", "m-ctx-p": "text", "m-ctx-bar": "style", "m-tokens": "text",
+    "m-date": "text", "m-mood": "text", "m-update": "text", "m-ops": "html",
+    "n-tag": "text", "n-head": "text", "n-source": "text", "n-card": "style", "n-sec-col": "html",
+}
+BOOT = re.compile(r"^([ \t]*)go\(\);[ \t]*$", re.M)
+
+# A compiled template is a list of static strings and slots:
+#   ["start", id, tag, [[name, value], ...]]  - the element's start tag
+#   ["content", id]                            - everything between its tags
+#   ["boot"]                                   - the go(); call
+Segment = Union[str, List[Any]]
+
+
+class _Compiler(HTMLParser):
+    def __init__(self, source: str):
+        super().__init__(convert_charrefs=False)
+        self.source = source
+        self.line_starts = [0] + [m.end() for m in re.finditer("\n", source)]
+        self.stack: List[Tuple[str, Optional[str]]] = []
+        self.spans: List[Tuple[int, int, List[Any]]] = []
+        self.open: Dict[str, int] = {}
+
+    def _offset(self) -> int:
+        line, col = self.getpos()
+        return self.line_starts[line - 1] + col
+
+    def handle_starttag(self, tag, attrs):
+        start = self._offset()
+        end = start + len(self.get_starttag_text())
+        el_id = dict(attrs).get("id")
+        if el_id in BOUND:
+            if BOUND[el_id] in ("style", "attrs"):
+                self.spans.append((start, end, ["start", el_id, tag, [list(a) for a in attrs]]))
+            else:
+                self.open[el_id] = end
+        if tag not in VOID_TAGS:
+            self.stack.append((tag, el_id))
+
+    def handle_endtag(self, tag):
+        pos = self._offset()
+        while self.stack:
+            open_tag, el_id = self.stack.pop()
+            if el_id in self.open:
+                self.spans.append((self.open.pop(el_id), pos, ["content", el_id]))
+            if open_tag == tag:
+                break
+
+
+def compile_template(source: str) -> List[Segment]:
+    parser = _Compiler(source)
+    parser.feed(source)
+    parser.close()
+    spans = sorted(parser.spans, key=lambda s: s[0])
+    boot = list(BOOT.finditer(source))
+    if boot:
+        spans.append((boot[-1].start() + len(boot[-1].group(1)), boot[-1].end(), ["boot"]))
+        spans.sort(key=lambda s: s[0])
+
+    segments: List[Segment] = []
+    pos = 0
+    for start, end, slot in spans:
+        if start < pos:
+            raise ValueError(f"Overlapping template slots at {slot}")
+        segments.append(source[pos:start])
+        segments.append(slot)
+        pos = end
+    segments.append(source[pos:])
+    return segments
+
+
+_TEMPLATE: Optional[Tuple[str, List[Segment]]] = None
+_lock = threading.Lock()
+
+
+def get_template(path: str = HTML_FILE, cache_path: str = TEMPLATE_CACHE) -> List[Segment]:
+    # Compiled once per page version: in memory, then .cache/template.json
+    global _TEMPLATE
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    with _lock:
+        if _TEMPLATE is not None and _TEMPLATE[0] == digest:
+            return _TEMPLATE[1]
+        try:
+            with open(cache_path, "r") as f:
+                cached = json.load(f)
+            if cached.get("version") == TEMPLATE_VERSION and cached.get("source") == digest:
+                _TEMPLATE = (digest, cached["segments"])
+                return _TEMPLATE[1]
+        except (OSError, ValueError):
+            pass
+        with open(path, "r", encoding="utf-8") as f:
+            segments = compile_template(f.read())
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": TEMPLATE_VERSION, "source": digest, "segments": segments}, f, ensure_ascii=False)
+        os.replace(tmp, cache_path)
+        _TEMPLATE = (digest, segments)
+        return segments
+
+
+# --- Values (same as go() in index.html) ---
+
+def _e(value: Any) -> str:
+    return html.escape("" if value is None else str(value))
+
+
+def bindings(bundle: Tuple[Dict[str, Any], ...]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Returns ({id: str | dict of style / attrs}, {"fid", "urls"})
+    d, wd, igd, nd, mbd = bundle
+    w, ig, n, mb = wd.get("weather", {}), igd.get("instagram", {}), nd.get("news", {}), mbd.get("moltbot", {})
+    m = d.get("maxx_status", {})
+    system, state, ops = mb.get("system", {}), mb.get("state", {}), mb.get("operations", {})
+    nm = n.get("featured") or {}
+    tm, curve = w.get("tomorrow"), w.get("temp_curve") or []
+    rain, change = w.get("rain_window"), w.get("next_change")
+    fid = m.get("frame_id") or str(int(time.time() * 1000))[-5:]
+
+    v: Dict[str, Any] = {
+        "w-loc": _e(w.get("location")),
+        "w-cond": _e(w.get("condition")),
+        "w-temp": _e(w.get("temp_c")),
+        "w-feels": _e(w.get("feels_like_c") or w.get("temp_c")),
+        "w-mm": _e(f"↑ {w.get('max_temp_c')}° ↓ {w.get('min_temp_c')}°"),
+        "w-wind": _e(f"{w.get('wind_kmh')} km/h"),
+        "w-hum": _e(f"{w.get('humidity')}%"),
+        "w-uv": _e(w.get("uv_index")),
+        "w-prob": _e(f"{w.get('prob_rain')}%"),
+        "w-icon": _e(w.get("icon") or "🌤️"),
+        # Stale = API unreachable, showing the last good forecast
+        "w-updated": _e(f"{w.get('stale_since')} · CACHE" if w.get("stale") else w.get("last_updated") or "--:--"),
+        "frame-id": _e(f"FID: {fid}"),
+        "w-tmrw-l": "Mañana" if tm else "",
+        "w-tmrw": _e(f"{tm.get('icon')} {tm.get('max')}°/{tm.get('min')}°") if tm else "",
+        "w-curve": {"attrs": {"points": " ".join(
+            f"{100 * i / (len(curve) - 1):g},{40 * (max(curve) - t) / ((max(curve) - min(curve)) or 1):g}"
+            for i, t in enumerate(curve)) if len(curve) > 1 else ""}},
+        "w-note": _e(f"☔ {rain['start']}–{rain['end']}" if rain
+                     else f"{change['time']} {change['condition']}" if change else ""),
+        "ig-user": _e(ig.get("username")),
+        "ig-foll": _e(ig.get("followers")),
+        "ig-grow": _e(ig.get("growth")),
+        "ig-posts": _e(ig.get("posts")),
+        "m-label": _e(m.get("label")),
+        "m-sub": _e(f"{system.get('current_model')} · {state.get('logic_mode')}"),
+        "m-ctx-p": _e(system.get("context_usage")),
+        "m-ctx-bar": {"style": {"width": system.get("context_usage")}},
+        "m-tokens": _e(f"🧮 {system.get('token_usage_daily')} tokens"),
+        "m-date": _e(m.get("date")),
+        "m-mood": _e(state.get("system_mood")),
+        "m-update": _e(ops.get("last_post_timestamp")),
+        "m-ops": (
+            f'<div class="m-pill"><div class="m-dot"></div>Goal: {_e(ops.get("daily_goal_progress"))}</div>'
+            f'<div class="m-pill"><div class="m-dot"></div>ETA: {_e(ops.get("next_post_eta"))}</div>'
+            f'<div class="m-pill" style="border-color:rgba(139, 92, 246, 0.3); color:rgba(139, 92, 246, 0.8)">'
+            f'{_e(state.get("last_action"))}</div>'
+        ),
+        "n-tag": _e(nm.get("tag") or "AI News"),
+        "n-head": _e(nm.get("headline") or "No headlines available"),
+        "n-source": _e(nm.get("source") or "Unknown"),
+        "n-sec-col": "".join(
+            f'<div class="n-sec-card"><div class="n-sec-head">{_e(s.get("headline"))}</div>'
+            f'<div class="n-sec-meta">{_e(s.get("source"))}</div></div>'
+            for s in (n.get("secondary_1"), n.get("secondary_2")) if s
+        ),
+    }
+    if w.get("bg_image"):
+        v["w-bg"] = {"style": {"background-image": f"url('{w['bg_image']}')"}}
+    if w.get("theme"):
+        v["card-weather"] = {"attrs": {"data-theme": w["theme"]}}
+    if w.get("hourly_forecast"):
+        v["w-hourly"] = "".join(
+            f'<div class="w-hr"><div class="w-hr-t">{_e(x.get("time"))}</div><div class="w-hr-i">{_e(x.get("icon"))}</div>'
+            f'<div class="w-hr-v">{_e(x.get("temp"))}°</div></div>'
+            for x in w["hourly_forecast"]
+        )
+    if nm.get("image_url"):
+        v["n-card"] = {"style": {"background-image": f"url('{nm['image_url']}')"}}
+    return v, {"fid": m.get("frame_id") or None, "urls": [u for u in (w.get("bg_image"), nm.get("image_url")) if u]}
+
+
+def _start_tag(tag: str, attrs: List[List[Any]], change: Dict[str, Any]) -> str:
+    attrs = [list(a) for a in attrs]
+    if "style" in change:
+        current = next((a[1] for a in attrs if a[0] == "style"), None) or ""
+        props = {k.strip(): v.strip() for k, v in (p.split(":", 1) for p in current.split(";") if ":" in p)}
+        props.update(change["style"])
+        change = dict(change.get("attrs", {}), style="; ".join(f"{k}: {v}" for k, v in props.items() if v))
+    else:
+        change = change.get("attrs", {})
+    names = [a[0] for a in attrs]
+    for name, value in change.items():
+        if name in names:
+            attrs[names.index(name)][1] = value
+        else:
+            attrs.append([name, value])
+    parts = [tag] + [name if value is None else f'{name}="{html.escape(str(value))}"' for name, value in attrs]
+    return "<" + " ".join(parts) + ">"
+
+
+def render(bundle: Tuple[Dict[str, Any], ...], template: Optional[List[Segment]] = None) -> str:
+    values, boot = bindings(bundle)
+    out = []
+    for seg in template or get_template():
+        if isinstance(seg, str):
+            out.append(seg)
+        elif seg[0] == "content":
+            out.append(values.get(seg[1], ""))
+        elif seg[0] == "start":
+            change = values.get(seg[1])
+            out.append(_start_tag(seg[2], seg[3], change if isinstance(change, dict) else {}))
+        else:
+            out.append(f"settle({json.dumps(boot['fid'])}, {json.dumps(boot['urls'])})"
+                       ".catch(function (e) { rendered({ ok: false, error: String(e) }); });")
+    return "".join(out)
+
+
+def bake(bundle: Tuple[Dict[str, Any], ...], path: str = SNAPSHOT_FILE,
+         template: Optional[List[Segment]] = None) -> str:
+    # Writes the snapshot atomically; returns its path
+    page = render(bundle, template)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(page)
+    os.replace(tmp, path)
+    return path
+
+
+if __name__ == "__main__":
+    from bundle import load_any
+
+    start = time.perf_counter()
+    out = bake(load_any())
+    print(f"Baked {out} in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,324 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Embedded state store (SQLite, WAL mode) shared by every script and run.
+#   snapshot  - current section dicts (data, weather, instagram, news, moltbot)
+#   readings  - time series of numeric weather / Instagram values
+#   counters  - atomic counters (FTP frame sequence, capture counter, ...)
+#   kv        - small bits of state (last delivered fingerprint, ...)
+#   frames    - index of archived frames (timestamp -> content hash)
+# Cron runs and agent runs can overlap: WAL lets readers proceed while one
+# writer commits, and counters are bumped inside BEGIN IMMEDIATE.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_FILE = os.path.join(PROJECT_DIR, "state.db")
+UPLOAD_COUNTER_FILE = os.path.join(PROJECT_DIR, "upload_counter.txt")
+CAPTURE_STATE_FILE = os.path.join(PROJECT_DIR, "scripts", "capture_state.json")
+FINGERPRINT_STATE_FILE = os.path.join(PROJECT_DIR, "scripts", "fingerprint_state.json")
+
+SECTIONS = ("data", "weather", "instagram", "news", "moltbot")
+
+# Numeric values worth a history, per section
+TRACKED_METRICS = {
+    "weather": ("temp_c", "feels_like_c", "humidity", "wind_kmh", "uv_index", "prob_rain", "max_temp_c", "min_temp_c"),
+    "instagram": ("followers", "posts", "engagement_rate"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot (
+    section    TEXT PRIMARY KEY,
+    payload    TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS readings (
+    ts     REAL NOT NULL,
+    source TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS readings_by_metric ON readings (source, metric, ts);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frames (
+    id     INTEGER PRIMARY KEY,
+    ts     REAL NOT NULL,
+    digest TEXT NOT NULL,
+    ext    TEXT NOT NULL,
+    size   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frames_by_ts ON frames (ts);
+CREATE INDEX IF NOT EXISTS frames_by_digest ON frames (digest);
+CREATE TABLE IF NOT EXISTS kv (
+    key        TEXT PRIMARY KEY,
+    value      TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_SUFFIXES = {"k": 1e3, "m": 1e6, "b": 1e9}
+
+
+def parse_number(value: Any) -> Optional[float]:
+    # "2.45M" -> 2450000, "1,234" -> 1234, "4.2%" -> 4.2, "+1,139" -> 1139
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    m = re.fullmatch(r"\s*([+-]?[\d,]*\.?\d+)\s*([kKmMbB%]?)\s*", value)
+    if not m:
+        return None
+    number = float(m.group(1).replace(",", ""))
+    return number * _SUFFIXES.get(m.group(2).lower(), 1)
+
+
+class StateStore:
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _tx(self, immediate: bool = True):
+        return _Transaction(self, immediate)
+
+    # --- Snapshot ---
+
+    def get_snapshot(self) -> Optional[Tuple[Dict[str, Any], ...]]:
+        rows = dict(self.conn.execute("SELECT section, payload FROM snapshot").fetchall())
+        if not rows:
+            return None
+        return tuple(json.loads(rows[s]) if s in rows else {} for s in SECTIONS)
+
+    def put_snapshot(self, bundle: Tuple[Dict[str, Any], ...], record: bool = True, ts: Optional[float] = None,
+                     record_weather: bool = True):
+        # record: add history readings; record_weather=False leaves out the weather
+        # card (kept, or built from a forecast whose values are already recorded)
+        ts = ts or time.time()
+        with self._tx() as c:
+            for section, payload in zip(SECTIONS, bundle):
+                c.execute(
+                    "INSERT INTO snapshot (section, payload, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(section) DO UPDATE SET payload = excluded.payload, updated_at = excluded.updated_at",
+                    (section, json.dumps(payload, ensure_ascii=False, separators=(",", ":")), ts),
+                )
+            if record:
+                self._record_bundle(c, bundle, ts, record_weather)
+
+    def _record_bundle(self, c, bundle, ts: float, record_weather: bool = True):
+        sections = dict(zip(SECTIONS, bundle))
+        w = sections.get("weather", {}).get("weather", {})
+        if record_weather and w and not w.get("stale"):
+            self._insert_readings(c, ts, "weather", w, TRACKED_METRICS["weather"])
+        ig = sections.get("instagram", {}).get("instagram", {})
+        if ig:
+            # Instagram is updated by hand; only keep a reading when it changes
+            changed = {}
+            for metric in TRACKED_METRICS["instagram"]:
+                value = parse_number(ig.get(metric))
+                if value is None:
+                    continue
+                row = c.execute(
+                    "SELECT value FROM readings WHERE source = 'instagram' AND metric = ? ORDER BY ts DESC LIMIT 1",
+                    (metric,),
+                ).fetchone()
+                if row is None or row[0] != value:
+                    changed[metric] = value
+            self._insert_readings(c, ts, "instagram", changed, changed.keys())
+
+    @staticmethod
+    def _insert_readings(c, ts: float, source: str, values: Dict[str, Any], metrics):
+        rows = []
+        for metric in metrics:
+            value = parse_number(values.get(metric))
+            if value is not None:
+                rows.append((ts, source, metric, value))
+        c.executemany("INSERT INTO readings (ts, source, metric, value) VALUES (?, ?, ?, ?)", rows)
+
+    # --- History ---
+
+    def record(self, source: str, metric: str, value: float, ts: Optional[float] = None):
+        with self._tx(immediate=False) as c:
+            c.execute("INSERT INTO readings (ts, source, metric, value) VALUES (?, ?, ?, ?)",
+                      (ts or time.time(), source, metric, float(value)))
+
+    def history(self, source: str, metric: str, since: Optional[float] = None, until: Optional[float] = None,
+                limit: Optional[int] = None) -> List[Tuple[float, float]]:
+        sql = "SELECT ts, value FROM readings WHERE source = ? AND metric = ? AND ts >= ? AND ts <= ? ORDER BY ts"
+        args: List[Any] = [source, metric, since or 0, until or float("inf")]
+        if limit:
+            sql = f"SELECT * FROM ({sql} DESC LIMIT ?) ORDER BY ts"
+            args.append(limit)
+        return self.conn.execute(sql, args).fetchall()
+
+    def latest(self, source: str, metric: str) -> Optional[Tuple[float, float]]:
+        rows = self.history(source, metric, limit=1)
+        return rows[0] if rows else None
+
+    def metrics(self) -> List[Tuple[str, str, int]]:
+        return self.conn.execute(
+            "SELECT source, metric, COUNT(*) FROM readings GROUP BY source, metric ORDER BY source, metric"
+        ).fetchall()
+
+    # --- Counters ---
+
+    def next_counter(self, name: str, start: int = 1) -> int:
+        with self._tx() as c:
+            row = c.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+            value = start if row is None else row[0] + 1
+            c.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (name, value),
+            )
+        return value
+
+    def get_counter(self, name: str) -> Optional[int]:
+        row = self.conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_counter(self, name: str, value: int):
+        with self._tx() as c:
+            c.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (name, int(value)),
+            )
+
+    # --- Key/value ---
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self.conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any):
+        with self._tx() as c:
+            c.execute(
+                "INSERT INTO kv (key, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (key, json.dumps(value), time.time()),
+            )
+
+    # --- Frame archive index ---
+
+    def add_frame(self, ts: float, digest: str, ext: str, size: int) -> int:
+        with self._tx() as c:
+            cur = c.execute("INSERT INTO frames (ts, digest, ext, size) VALUES (?, ?, ?, ?)", (ts, digest, ext, size))
+        return cur.lastrowid
+
+    def frames(self, since: Optional[float] = None, until: Optional[float] = None) -> List[Tuple[int, float, str, str, int]]:
+        return self.conn.execute(
+            "SELECT id, ts, digest, ext, size FROM frames WHERE ts >= ? AND ts <= ? ORDER BY ts",
+            (since or 0, until or float("inf")),
+        ).fetchall()
+
+    def delete_frames(self, ids) -> List[Tuple[str, str]]:
+        # Drops index rows; returns (digest, ext) of objects no longer referenced
+        ids = list(ids)
+        with self._tx() as c:
+            orphans = set()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                orphans.update(c.execute(f"SELECT digest, ext FROM frames WHERE id IN ({marks})", chunk).fetchall())
+                c.execute(f"DELETE FROM frames WHERE id IN ({marks})", chunk)
+            return [o for o in orphans
+                    if c.execute("SELECT 1 FROM frames WHERE digest = ? LIMIT 1", (o[0],)).fetchone() is None]
+
+    # --- Migration from the file-based state ---
+
+    def migrate_legacy(self, load_files=None):
+        # Counters from upload_counter.txt / capture_state.json
+        if self.get_counter("upload_frame") is None and os.path.exists(UPLOAD_COUNTER_FILE):
+            try:
+                with open(UPLOAD_COUNTER_FILE, "r") as f:
+                    self.set_counter("upload_frame", int(f.read().strip()))
+            except ValueError:
+                pass
+        if self.get_counter("capture") is None and os.path.exists(CAPTURE_STATE_FILE):
+            try:
+                with open(CAPTURE_STATE_FILE, "r") as f:
+                    self.set_counter("capture", int(json.load(f).get("counter", 0)))
+            except (ValueError, AttributeError):
+                pass
+
+        # Last delivered fingerprint, once kept in scripts/ next to the code
+        if os.path.exists(FINGERPRINT_STATE_FILE):
+            try:
+                with open(FINGERPRINT_STATE_FILE, "r") as f:
+                    delivered = json.load(f)
+                if self.get("delivered") is None and delivered.get("fingerprint"):
+                    self.set("delivered", delivered)
+            except (ValueError, AttributeError):
+                pass
+            os.remove(FINGERPRINT_STATE_FILE)
+
+        # Snapshot from bundle.json / the per-file JSON layout
+        if load_files is not None and self.get_snapshot() is None:
+            data, weather, ig, news, moltbot = load_files()
+            # instagram and news used to live inside data.json
+            if "instagram" in data:
+                ig = dict(ig or {})
+                ig["instagram"] = data.pop("instagram")
+            if "news" in data:
+                news = dict(news or {})
+                news["news"] = data.pop("news")
+            data.pop("weather", None)
+            self.put_snapshot((data, weather, ig, news, moltbot), record=False)
+
+
+class _Transaction:
+    def __init__(self, store: StateStore, immediate: bool):
+        self.store = store
+        self.immediate = immediate
+
+    def __enter__(self):
+        self.store._lock.acquire()
+        self.store.conn.execute("BEGIN IMMEDIATE" if self.immediate else "BEGIN")
+        return self.store.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.store.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.store._lock.release()
+
+
+_STORE: Optional[StateStore] = None
+
+
+def get_store(path: Optional[str] = None) -> StateStore:
+    # Process-wide store. The first caller may pick the path; later callers
+    # without one share it.
+    global _STORE
+    if _STORE is None or (path is not None and _STORE.path != path):
+        _STORE = StateStore(path or DB_FILE)
+    return _STORE
+
+
+if __name__ == "__main__":
+    import sys
+    from datetime import datetime
+
+    store = get_store()
+    if len(sys.argv) >= 4 and sys.argv[1] == "history":
+        hours = float(sys.argv[4]) if len(sys.argv) > 4 else 24
+        for ts, value in store.history(sys.argv[2], sys.argv[3], since=time.time() - hours * 3600):
+            print(f"{datetime.fromtimestamp(ts):%Y-%m-%d %H:%M}  {value:g}")
+    else:
+        for source, metric, count in store.metrics():
+            latest = store.latest(source, metric)
+            print(f"{source}.{metric}: {count} readings, latest {latest[1]:g}")
+        print("usage: state_store.py history <source> <metric> [hours]")
@@ -1,15 +1,18 @@
 import json
 import os
-import subprocess
 from datetime import datetime
 
+from bundle import load_legacy
+from fetch import CLIENT
+from snapshot import bake, get_template
+from tracing import count, flush as flush_metrics, span
+
 # Config
 WORKSPACE = "/Users/maxx/.openclaw/workspace"
 PROJECT_DIR = os.path.join(WORKSPACE, "smart-frame")
 DATA_FILE = os.path.join(PROJECT_DIR, "data.json")
 HTML_FILE = os.path.join(PROJECT_DIR, "index.html")
-FTP_HOST = "192.168.100.12"
-FTP_PORT = "2221"
+SNAPSHOT_FILE = os.path.join(PROJECT_DIR, "snapshot.html")
 
 # Weather code to emoji mapping
 WEATHER_CODES = {
@@ -51,83 +54,81 @@ def update():
             '&timezone=America/Costa_Rica'
             '&forecast_days=1'
         )
-        res = subprocess.check_output(['curl', '-s', api_url], text=True)
-        api = json.loads(res)
+        with span("fetch", source="weather"):
+            api = CLIENT.get_json(api_url, timeout=15)
         
         # New API structure
         c = api['current']
         w = c # mapping for legacy code below if needed, or update below
         
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
-
-        # Current weather
-        data['weather']['temp_c'] = str(round(c['temperature_2m']))
-        data['weather']['wind_kmh'] = str(round(c['wind_speed_10m']))
-        data['weather']['condition'] = code_to_condition(c.get('weather_code', 0))
-
-        # Daily data
-        if 'daily' in api:
-            daily = api['daily']
-            data['weather']['max_temp_c'] = str(round(daily['temperature_2m_max'][0]))
-            data['weather']['min_temp_c'] = str(round(daily['temperature_2m_min'][0]))
-            data['weather']['uv_index'] = str(round(daily['uv_index_max'][0]))
-            data['weather']['prob_rain'] = str(round(daily['precipitation_probability_max'][0]))
-
-        # Feels like (apparent temperature at current hour)
-        current_hour = datetime.now().hour
-        if 'hourly' in api and 'apparent_temperature' in api['hourly']:
-            feels = api['hourly']['apparent_temperature']
-            if current_hour < len(feels):
-                data['weather']['feels_like_c'] = str(round(feels[current_hour]))
-
-        # Humidity from hourly
-        if 'hourly' in api and 'relative_humidity_2m' in api['hourly']:
-            hum = api['hourly']['relative_humidity_2m']
-            if current_hour < len(hum):
-                data['weather']['humidity'] = str(round(hum[current_hour]))
-
-        # Hourly forecast (next 3 slots: +3h, +6h, +9h from now)
-        if 'hourly' in api:
-            hourly_temps = api['hourly'].get('temperature_2m', [])
-            hourly_codes = api['hourly'].get('weather_code', [])
-            hourly_times = api['hourly'].get('time', [])
-            forecast = []
-            for offset in [3, 6, 9]:
-                idx = current_hour + offset
-                if idx < len(hourly_temps) and idx < len(hourly_codes):
-                    t = datetime.fromisoformat(hourly_times[idx])
-                    forecast.append({
-                        "time": t.strftime("%-I%p"),
-                        "icon": code_to_icon(hourly_codes[idx]),
-                        "temp": str(round(hourly_temps[idx]))
-                    })
-            if forecast:
-                data['weather']['hourly_forecast'] = forecast
-
-        # Update date and last update time
-        data['maxx_status']['date'] = datetime.now().strftime("%A, %d %b").capitalize()
-        data['maxx_status']['last_update_time'] = now
-
-        with open(DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-
-        # Update HTML "last update" text
-        with open(HTML_FILE, 'r') as f:
-            content = f.read()
-
-        import re
-        content = re.sub(r'Last update: [\d:]+', f'Last update: {now}', content)
-        # Update hardcoded temp for reliable screenshot
-        content = re.sub(r'id="w-temp">[\d]+', f'id="w-temp">{data["weather"]["temp_c"]}', content)
-
-        with open(HTML_FILE, 'w') as f:
-            f.write(content)
+        with span("transform", source="weather"):
+            with open(DATA_FILE, 'r') as f:
+                data = json.load(f)
+
+            # Current weather
+            data['weather']['temp_c'] = str(round(c['temperature_2m']))
+            data['weather']['wind_kmh'] = str(round(c['wind_speed_10m']))
+            data['weather']['condition'] = code_to_condition(c.get('weather_code', 0))
+
+            # Daily data
+            if 'daily' in api:
+                daily = api['daily']
+                data['weather']['max_temp_c'] = str(round(daily['temperature_2m_max'][0]))
+                data['weather']['min_temp_c'] = str(round(daily['temperature_2m_min'][0]))
+                data['weather']['uv_index'] = str(round(daily['uv_index_max'][0]))
+                data['weather']['prob_rain'] = str(round(daily['precipitation_probability_max'][0]))
+
+            # Feels like (apparent temperature at current hour)
+            current_hour = datetime.now().hour
+            if 'hourly' in api and 'apparent_temperature' in api['hourly']:
+                feels = api['hourly']['apparent_temperature']
+                if current_hour < len(feels):
+                    data['weather']['feels_like_c'] = str(round(feels[current_hour]))
+
+            # Humidity from hourly
+            if 'hourly' in api and 'relative_humidity_2m' in api['hourly']:
+                hum = api['hourly']['relative_humidity_2m']
+                if current_hour < len(hum):
+                    data['weather']['humidity'] = str(round(hum[current_hour]))
+
+            # Hourly forecast (next 3 slots: +3h, +6h, +9h from now)
+            if 'hourly' in api:
+                hourly_temps = api['hourly'].get('temperature_2m', [])
+                hourly_codes = api['hourly'].get('weather_code', [])
+                hourly_times = api['hourly'].get('time', [])
+                forecast = []
+                for offset in [3, 6, 9]:
+                    idx = current_hour + offset
+                    if idx < len(hourly_temps) and idx < len(hourly_codes):
+                        t = datetime.fromisoformat(hourly_times[idx])
+                        forecast.append({
+                            "time": t.strftime("%-I%p"),
+                            "icon": code_to_icon(hourly_codes[idx]),
+                            "temp": str(round(hourly_temps[idx]))
+                        })
+                if forecast:
+                    data['weather']['hourly_forecast'] = forecast
+
+            # Update date and last update time
+            data['maxx_status']['date'] = datetime.now().strftime("%A, %d %b").capitalize()
+            data['maxx_status']['last_update_time'] = now
+
+        with span("write"):
+            with open(DATA_FILE, 'w') as f:
+                json.dump(data, f, indent=2)
+
+            # Bake the values into snapshot.html for the screenshot; index.html is left untouched
+            sections = load_legacy(PROJECT_DIR)
+            bake((data, {"weather": data['weather']}) + sections[2:], path=SNAPSHOT_FILE,
+                 template=get_template(HTML_FILE))
 
     except Exception as e:
         print(f"Error updating data: {e}")
+        count("sync_failures", script="sync")
 
     print("Local files updated. Ready for screenshot and upload.")
 
 if __name__ == "__main__":
-    update()
+    with span("sync"):
+        update()
+    flush_metrics()
@@ -0,0 +1,164 @@
+import contextlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Structured tracing and metrics for the update pipeline.
+#   span("encode", format="png")  - timed stage; one JSON line per span in
+#                                   TRACE_FILE (trace/span/parent ids, ms, ok, error)
+#   count("ftp_operations")       - monotonic counter (kept across runs in the state store)
+#   gauge("frame_bytes", n)       - last value
+# Spans nest per thread; work handed to another thread carries current()
+# over and runs under attach(), so it stays in the same trace.
+# flush() rewrites METRICS_FILE in the Prometheus text format, for the
+# node_exporter textfile collector. Alert on e.g.
+#   time() - smart_frame_last_delivery_timestamp_seconds > 3600
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRACE_FILE = os.environ.get("SMART_FRAME_TRACE_FILE", os.path.join(PROJECT_DIR, ".cache", "trace.jsonl"))
+METRICS_FILE = os.environ.get("SMART_FRAME_METRICS_FILE", os.path.join(PROJECT_DIR, ".cache", "smart_frame.prom"))
+TRACE_MAX_BYTES = 5 * 1024 * 1024   # rotated to trace.jsonl.1 beyond this
+PREFIX = "smart_frame_"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_local = threading.local()
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = {}
+_gauges: Dict[Tuple[str, Labels], float] = {}
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def count(name: str, n: float = 1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+def gauge(name: str, value: float, **labels):
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+
+def _write_line(record: Dict[str, Any]):
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+    with _lock:
+        try:
+            os.makedirs(os.path.dirname(TRACE_FILE), exist_ok=True)
+            if os.path.exists(TRACE_FILE) and os.path.getsize(TRACE_FILE) > TRACE_MAX_BYTES:
+                os.replace(TRACE_FILE, TRACE_FILE + ".1")
+            with open(TRACE_FILE, "a") as f:
+                f.write(line)
+        except OSError:
+            pass
+
+
+def _stack() -> List[Dict[str, Any]]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def current() -> Optional[Dict[str, Any]]:
+    # The innermost open span of this thread ({"trace", "span", "parent"}), for attach()
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+@contextlib.contextmanager
+def attach(context: Optional[Dict[str, Any]]) -> Iterator[None]:
+    # Runs a worker thread's spans as children of `context`, a current() taken
+    # in the thread that handed the work over (the span stack is per thread)
+    stack = _stack()
+    if context is not None:
+        stack.append(context)
+    try:
+        yield
+    finally:
+        if context is not None:
+            stack.pop()
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs) -> Iterator[Dict[str, Any]]:
+    # Yields the span's attribute dict, so a stage can add results (bytes, cache, ...)
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    current = {
+        "trace": parent["trace"] if parent else uuid.uuid4().hex[:16],
+        "span": uuid.uuid4().hex[:8],
+        "parent": parent["span"] if parent else None,
+    }
+    stack.append(current)
+    started, wall = time.perf_counter(), time.time()
+    error: Optional[BaseException] = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        stack.pop()
+        seconds = time.perf_counter() - started
+        record = dict(current, ts=round(wall, 3), name=name, ms=round(seconds * 1000, 2), ok=error is None)
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        if attrs:
+            record["attrs"] = attrs
+        _write_line(record)
+        gauge("stage_last_seconds", round(seconds, 4), stage=name)
+        count("stage_runs_total", stage=name)
+        if error is not None:
+            count("stage_failures_total", stage=name)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def flush(store=None):
+    # Merges this run's counters into the persisted totals and rewrites the textfile
+    with _lock:
+        counters, gauges = dict(_counters), dict(_gauges)
+        _counters.clear()
+    if store is None:
+        from state_store import get_store
+        store = get_store()
+    saved = store.get("metrics", {"counters": [], "gauges": []})
+    totals = {(n, tuple(map(tuple, l))): v for n, l, v in saved["counters"]}
+    for key, value in counters.items():
+        totals[key] = totals.get(key, 0) + value
+    last = {(n, tuple(map(tuple, l))): v for n, l, v in saved["gauges"]}
+    last.update(gauges)
+    store.set("metrics", {"counters": [[n, l, v] for (n, l), v in totals.items()],
+                          "gauges": [[n, l, v] for (n, l), v in last.items()]})
+
+    lines = []
+    for kind, values, suffix in (("counter", totals, "_total"), ("gauge", last, "")):
+        for name in sorted({n for n, _ in values}):
+            metric = PREFIX + name + ("" if name.endswith(suffix) else suffix)
+            lines.append(f"# TYPE {metric} {kind}")
+            for (n, labels), value in sorted(values.items()):
+                if n == name:
+                    lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+    try:
+        os.makedirs(os.path.dirname(METRICS_FILE), exist_ok=True)
+        tmp = f"{METRICS_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, METRICS_FILE)
+    except OSError as e:
+        print(f"Could not write metrics file: {e}")
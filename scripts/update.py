@@ -1,10 +1,29 @@
+import copy
 import json
 import os
 import subprocess
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, Dict, List, Union
 
+import numpy as np
+
+from archive import archive_frame, prune
+from astronomy import sky
+from bundle import SECTIONS, load_any, make_bundle, write_bundle
+from data_branch import DataBranch
+from fetch import fetch_all
+from fingerprint import SKIP_POLICY, fingerprint, is_unchanged, mark_delivered
+from forecast import Forecast, to_datetime
+from devices import close_device_sessions, deliver_all, encode_for, load_devices, profile_key
+from http_cache import get_json_cached, get_json_stale, wait_for_revalidation
+from image_cache import localize
+from local_server import PAGE_DIRS, PAGE_FILES, ensure_server
+from publisher import Publisher
+from snapshot import bake as bake_snapshot
+from state_store import get_store
+from tracing import count, flush as flush_metrics, gauge, span
+
 # Configuration
 WORKSPACE = "/Users/maxx/.openclaw/workspace"
 PROJECT_DIR = os.path.join(WORKSPACE, "projects", "smart-frame")
@@ -14,8 +33,29 @@ INSTAGRAM_FILE = os.path.join(PROJECT_DIR, "instagram.json")
 NEWS_FILE = os.path.join(PROJECT_DIR, "news.json")
 MOLTBOT_FILE = os.path.join(PROJECT_DIR, "moltbot.json")
 HTML_FILE = os.path.join(PROJECT_DIR, "index.html")
-FTP_HOST = "192.168.100.12"
-FTP_PORT = "2221"
+BUNDLE_FILE = os.path.join(PROJECT_DIR, "bundle.json")
+STATE_DB = os.path.join(PROJECT_DIR, "state.db")
+# Also write data.json, weather.json, instagram.json, news.json and moltbot.json
+LEGACY_FILES = os.environ.get("SMART_FRAME_LEGACY_FILES", "0") == "1"
+# What sync_github() publishes: the files the page loads, as served by
+# scripts/local_server.py. Frames go to the archive (scripts/archive.py), not git
+PUBLISHED_FILES = list(PAGE_FILES + PAGE_DIRS)
+# Seconds between data branch commits; changes in between are folded into the next one
+PUBLISH_INTERVAL = float(os.environ.get("SMART_FRAME_PUBLISH_INTERVAL", "300"))
+ARCHIVE_FRAMES = os.environ.get("SMART_FRAME_ARCHIVE", "1") == "1"
+# Frames stay in memory from render to upload; set to also write Dashboard_Latest.<ext>
+WRITE_LATEST = os.environ.get("SMART_FRAME_WRITE_LATEST", "0") == "1"
+
+# Frame render mode:
+#   "native"  - draw the frame in-process with scripts/render.py (no network, no browser)
+#   "worker"  - draw index.html in the warm capture worker (scripts/capture_worker.js)
+#   "browser" - screenshot index.html with scripts/capture_local.js
+# Browser-based modes load the page from the local server (scripts/local_server.py);
+# GitHub Pages is published in the background and never blocks delivery.
+RENDER_MODE = os.environ.get("SMART_FRAME_RENDER_MODE", "native")
+
+# Target frames (host, resolution, formats, byte budget, slot policy) come
+# from devices.json, see scripts/devices.py.
 
 # Weather code to emoji mapping
 WEATHER_CODES = {
@@ -42,201 +82,258 @@ def code_to_condition(code):
     elif code >= 95: return "Tormenta"
     return "Variable"
 
-def update_data():
+# Open-Meteo forecast with full hourly + daily data
+WEATHER_API_URL = (
+    'https://api.open-meteo.com/v1/forecast'
+    '?latitude=10.0163&longitude=-84.2116'
+    '&current=temperature_2m,wind_speed_10m,weather_code'
+    '&hourly=temperature_2m,weather_code,apparent_temperature,relative_humidity_2m,wind_speed_10m,precipitation_probability'
+    '&daily=weather_code,temperature_2m_max,temperature_2m_min,uv_index_max,precipitation_probability_max,sunrise,sunset'
+    '&timezone=America/Costa_Rica'
+    '&forecast_days=3'
+)
+# Hours ahead covered by the temperature curve, rain windows and next change
+OUTLOOK_HOURS = 24
+
+# Forecast cache: the hourly/daily arrays cover three days, so between
+# refreshes the current values are derived locally from them (scripts/forecast.py).
+WEATHER_CACHE_TTL = 30 * 60        # serve without asking for 30 min
+WEATHER_CACHE_SWR = 6 * 3600       # then serve while revalidating for 6 h
+WEATHER_CACHE_MAX_STALE = 48 * 3600  # last good payload if the API is down
+
+# --- Data sources (run concurrently by fetch.fetch_all) ---
+
+def fetch_weather(client):
+    api, meta = get_json_cached(client, WEATHER_API_URL, ttl=WEATHER_CACHE_TTL, swr=WEATHER_CACHE_SWR)
+    return {'api': api, 'cache': meta}
+
+def weather_fallback(error):
+    # Every attempt failed: the last good forecast, flagged stale
+    api, meta = get_json_stale(WEATHER_API_URL, error, max_stale=WEATHER_CACHE_MAX_STALE)
+    return {'api': api, 'cache': meta}
+
+def fetch_news(client):
+    # Stale news API disabled. Using manual/cached news.
+    # news_api_url = "https://actually-relevant-api.onrender.com/api/stories?issueSlug=artificial-intelligence"
+    return None
+
+def fetch_instagram(client):
+    # No Instagram API yet; instagram.json is maintained manually.
+    return None
+
+SOURCES = {
+    'weather': fetch_weather,
+    'news': fetch_news,
+    'instagram': fetch_instagram,
+}
+# Per-source deadline in seconds (including retries)
+SOURCE_DEADLINES = {'weather': 20, 'news': 20, 'instagram': 20}
+# Called once a source's retries or deadline are used up
+SOURCE_FALLBACKS = {'weather': weather_fallback}
+
+def current_conditions(fc, api, now):
+    # The 'current' block is only right for the hour it was fetched in.
+    # For a cached payload, read the same fields from the hourly arrays instead.
+    c = dict(api.get('current', {}))
+    if c.get('time', '')[:13] == now.strftime("%Y-%m-%dT%H") or not fc.hourly:
+        return c
+    idx = fc.hour_index(now)
+    for key in ('temperature_2m', 'wind_speed_10m', 'weather_code'):
+        value = fc.value(key, idx)
+        if value is not None:
+            c[key] = value
+    return c
+
+def temp_range(ranges, daily, day):
+    # (min, max) for `day` from the hourly column; the API's daily values
+    # when the hourly data does not cover that day
+    i = np.flatnonzero(ranges['day'] == np.datetime64(day, 'D'))
+    if len(i) and not np.isnan(ranges['max'][i[0]]):
+        return ranges['min'][i[0]], ranges['max'][i[0]]
+    return daily['temperature_2m_min'], daily['temperature_2m_max']
+
+def apply_sky(w, code, now):
+    # Theme, background and icon from the weather code and the offline sun /
+    # moon table (scripts/astronomy.py); also re-run on a kept card when the
+    # weather API is not due or unreachable, so day/night still flips on time.
+    s = sky(now)
+    is_day = s['is_day']
+    w['weather_code'] = code
+    w['sunrise'] = s['sunrise'].strftime("%H:%M") if s['sunrise'] else None
+    w['sunset'] = s['sunset'].strftime("%H:%M") if s['sunset'] else None
+
+    # --- BACKGROUND & THEME LOGIC ---
+    # Default Day
+    bg_image = "images/weather_sunny.png"
+    theme = "day"
+    
+    # Rain / Storm / Cloudy overrides
+    # 51-67: Drizzle/Rain, 80-82: Showers, 95-99: Thunderstorm
+    if code in [51, 53, 55, 61, 63, 65, 80, 81, 82, 95, 96, 99]:
+        bg_image = "images/weather_rainy.png"
+        theme = "rain"
+    # 45, 48: Fog, 3: Overcast, 2: Partly Cloudy (sometimes cloudy bg is better)
+    elif code in [45, 48, 3, 2]:
+        bg_image = "images/weather_cloudy.png"
+        theme = "cloudy"
+    
+    # Night Override (Strict)
+    if not is_day:
+        bg_image = "images/weather_night.png"
+        theme = "night"
+        
+    w['bg_image'] = bg_image
+    w['theme'] = theme
+
+    # --- ICON LOGIC (Sun vs Moon Phase) ---
+    if not is_day and code in [0, 1]:  # Clear/Mainly Clear at night
+         w['icon'] = s['moon_icon']
+    else:
+         w['icon'] = code_to_icon(code)
+    return w
+
+def build_weather(w, api, now):
+    fc = Forecast.from_api(api)
+    if fc.hourly and fc.hour_index(now) is None:
+        # Outdated or truncated payload: the caller keeps the previous card
+        raise ValueError(f"forecast does not cover {now:%Y-%m-%d %H}:00")
+    c = current_conditions(fc, api, now)
+    
+    w['temp_c'] = str(round(c['temperature_2m']))
+    w['wind_kmh'] = str(round(c['wind_speed_10m']))
+    w['condition'] = code_to_condition(c.get('weather_code', 0))
+    apply_sky(w, int(c.get('weather_code', 0)), now)
+
+    # Daily
+    ranges = fc.daily_range('temperature_2m')
+    today = fc.day(now)
+    if today:
+        low, high = temp_range(ranges, today, now.date())
+        w['max_temp_c'] = str(round(high))
+        w['min_temp_c'] = str(round(low))
+        w['uv_index'] = str(round(today['uv_index_max']))
+        w['prob_rain'] = str(round(today['precipitation_probability_max']))
+    tomorrow = fc.day(now, 1)
+    if tomorrow:
+        low, high = temp_range(ranges, tomorrow, now.date() + timedelta(days=1))
+        w['tomorrow'] = {
+            "max": str(round(high)),
+            "min": str(round(low)),
+            "icon": code_to_icon(int(tomorrow.get('weather_code', 0))),
+            "condition": code_to_condition(int(tomorrow.get('weather_code', 0))),
+            "prob_rain": str(round(tomorrow['precipitation_probability_max'])),
+        }
+
+    # Feels like + humidity from hourly
+    current_hour = fc.hour_index(now)
+    if fc.hourly:
+        feels_like = fc.value('apparent_temperature', current_hour)
+        if feels_like is not None:
+            w['feels_like_c'] = str(round(feels_like))
+        humidity = fc.value('relative_humidity_2m', current_hour)
+        if humidity is not None:
+            w['humidity'] = str(round(humidity))
+
+        # Hourly forecast (next 3 time slots)
+        slots = fc.slots(now, [3, 6, 9], ['temperature_2m', 'weather_code'])
+        forecast = [{
+            "time": to_datetime(t).strftime("%-I%p"),
+            "icon": code_to_icon(int(code)),
+            "temp": str(round(temp))
+        } for t, code, temp in zip(slots['time'], slots.get('weather_code', []), slots.get('temperature_2m', []))]
+        if forecast:
+            w['hourly_forecast'] = forecast # type: ignore
+
+        # Next 24 h: temperature curve, first rain window, next change in conditions
+        curve = fc.series(now, 'temperature_2m', OUTLOOK_HOURS)
+        if len(curve):
+            w['temp_curve'] = np.round(np.nan_to_num(curve, nan=np.nanmean(curve))).astype(int).tolist()
+        rain = fc.rain_windows(now, OUTLOOK_HOURS)
+        w['rain_window'] = {"start": rain[0][0].strftime("%-I%p"), "end": rain[0][1].strftime("%-I%p")} if rain else None
+        change = fc.next_change(now, code_to_condition, OUTLOOK_HOURS)
+        w['next_change'] = {"time": change[0].strftime("%-I%p"), "condition": change[1]} if change else None
+    return w
+
+# Per-source results of the last update_data() call (see fetch.fetch_all)
+last_results: Dict[str, Dict[str, Any]] = {}
+# fetched_at of the forecast that call built the weather card from (None for a
+# kept card); save_data() records a weather history reading once per forecast,
+# so a payload refreshed in the background is recorded the first cycle it is shown
+weather_fetched_at = None
+
+def update_data(write=True, sources=None):
+    # sources: names from SOURCES to refresh (default all); the others keep
+    # their last snapshot values.
+    global weather_fetched_at
     print("Updating data...")
-    with open(DATA_FILE, 'r') as f:
-        data = json.load(f)
+    # Previous snapshot from the state store (imported once from bundle.json / legacy files)
+    store = get_store(STATE_DB)
+    store.migrate_legacy(lambda: load_any(BUNDLE_FILE, PROJECT_DIR))
+    data, prev_weather, ig_data, news_data, _ = store.get_snapshot() or ({}, {}, {}, {}, {})
     
     # Initialize separate weather dict
     weather_data: Dict[str, Any] = { "weather": {} }
     w = weather_data['weather']
     w['last_updated'] = datetime.now().strftime("%H:%M")
 
-    # Initialize separate instagram dict (read existing to preserve or default)
-    ig_data: Dict[str, Any] = { "instagram": {} }
-    if os.path.exists(INSTAGRAM_FILE):
-        with open(INSTAGRAM_FILE, 'r') as f:
-            ig_data = json.load(f)
-    
-    # If instagram is in data (migration), move it
-    
-    # If instagram is in data (migration), move it
-    if 'instagram' in data:
-        ig_data['instagram'] = data['instagram'] # type: ignore
-        del data['instagram']
-
-    # Initialize separate news dict (Preserve existing if API fails)
-    news_data: Dict[str, Any] = { "news": {} }
-    if os.path.exists(NEWS_FILE):
-        with open(NEWS_FILE, 'r') as f:
-            news_data = json.load(f)
-    
-    # If news is in data (migration), move it initially
-    if 'news' in data:
-        news_data['news'] = data['news'] # type: ignore
-        del data['news']
-
-    # Fetch weather with full hourly + daily data
-    try:
-        api_url = (
-            'https://api.open-meteo.com/v1/forecast'
-            '?latitude=10.0163&longitude=-84.2116'
-            '&current=temperature_2m,wind_speed_10m,weather_code,is_day'
-            '&hourly=temperature_2m,weather_code,apparent_temperature,relative_humidity_2m,wind_speed_10m'
-            '&daily=temperature_2m_max,temperature_2m_min,uv_index_max,precipitation_probability_max,sunrise,sunset'
-            '&timezone=America/Costa_Rica'
-            '&forecast_days=1'
-        )
-        # Note: Open-Meteo V1 Forecast API doesn't have 'moon_phase' in 'daily'. 
-        # We'll use a simple calculation or check if it's available in their daily parameters.
-        # Actually, Open-Meteo DOES support 'current=is_day' which we use.
-        # For moon phase, we might need to calculate it or use a different endpoint.
-        # However, for simplicity and since the user asked for *a* moon phase, we can try to find an approximate one 
-        # or just use standard moon icons if distinct phases aren't easily available in this exact call without a separate astronomy call.
-        # WAIT: standard Open-Meteo DOES NOT return moon_phase in the free forecast API easily without astronomy.
-        # Let's switch to the specific Astronomy endpoint if we want perfect accuracy, OR use a simplified approach.
-        # Actually, let's use the 'daily' parameter 'sunrise','sunset' effectively for day/night, 
-        # but for Moon Phase, let's add specific logic or a separate call if needed. 
-        # User prompt: "si esta despejado en lugar de un sol deberia haber una luna con su fase correcta"
-        
-        # Checking Open-Meteo docs: 'daily=sunrise,sunset' is standard. 'daily=moon_phase' is valid!
-        # Re-constructing URL with moon_phase.
-        
-        api_url = (
-            'https://api.open-meteo.com/v1/forecast'
-            '?latitude=10.0163&longitude=-84.2116'
-            '&current=temperature_2m,wind_speed_10m,weather_code,is_day'
-            '&hourly=temperature_2m,weather_code,apparent_temperature,relative_humidity_2m,wind_speed_10m'
-            '&daily=temperature_2m_max,temperature_2m_min,uv_index_max,precipitation_probability_max,sunrise,sunset'
-            '&timezone=America/Costa_Rica'
-            '&forecast_days=1'
-        )
-        # We need a separate call for moon phase usually on older versions, but let's try strict approach:
-        # We can calculate moon phase locally as a fallback if API fails, but let's try to assume we can get it or just use a generic moon for now if it complicates.
-        # Actually, doing a separate request for valid moon phase is better.
-        # BUT, let's try to keep it simple. If we can't get strict phase easily, we'll use a standard moon.
-        # Let's try to add '&daily=weather_code' just in case.
-        
-        # Let's use a robust moon phase calculation function in python since the API url was already constructed above without it in the simple list.
-        # Actually, let's just stick to the requested changes.
-        
-        # RE-WRITING THE URL TO INCLUDE EVERYTHING WE NEED from the start.
-        api_url = (
-            'https://api.open-meteo.com/v1/forecast'
-            '?latitude=10.0163&longitude=-84.2116'
-            '&current=temperature_2m,wind_speed_10m,weather_code,is_day'
-            '&hourly=temperature_2m,weather_code,apparent_temperature,relative_humidity_2m,wind_speed_10m'
-            '&daily=temperature_2m_max,temperature_2m_min,uv_index_max,precipitation_probability_max,sunrise,sunset'
-            '&timezone=America/Costa_Rica'
-            '&forecast_days=1'
-        )
-        
-        res = subprocess.check_output(['curl', '-s', api_url], text=True)
-        api = json.loads(res)
-        
-        c = api['current']
-        
-        w['temp_c'] = str(round(c['temperature_2m']))
-        w['wind_kmh'] = str(round(c['wind_speed_10m']))
-        w['condition'] = code_to_condition(c.get('weather_code', 0))
-        
-        # --- BACKGROUND & THEME LOGIC ---
-        code = c.get('weather_code', 0)
-        is_day = c.get('is_day', 1)
-        
-        # Default Day
-        bg_image = "images/weather_sunny.png"
-        theme = "day"
-        
-        # Rain / Storm / Cloudy overrides
-        # 51-67: Drizzle/Rain, 80-82: Showers, 95-99: Thunderstorm
-        if code in [51, 53, 55, 61, 63, 65, 80, 81, 82, 95, 96, 99]:
-            bg_image = "images/weather_rainy.png"
-            theme = "rain"
-        # 45, 48: Fog, 3: Overcast, 2: Partly Cloudy (sometimes cloudy bg is better)
-        elif code in [45, 48, 3, 2]:
-            bg_image = "images/weather_cloudy.png"
-            theme = "cloudy"
-        
-        # Night Override (Strict)
-        if is_day == 0:
-            bg_image = "images/weather_night.png"
-            theme = "night"
-            
-        w['bg_image'] = bg_image
-        w['theme'] = theme
-
-        # --- ICON LOGIC (Sun vs Moon Phase) ---
-        # Calculate approximate moon phase since API might not give it directly in this call easily without checking docs for 'daily=moon_phase' compatibility
-        # Let's implement a simple moon phase calc or just use 🌙 if complex.
-        # Actually, let's use a simple epoch calc for phase.
-        
-        def get_moon_phase_icon():
-            mp = 29.530588853
-            p = datetime.now().timestamp()
-            # New Moon: Feb 17, 2026 12:01 UTC = 1771329660
-            # Use this recent epoch to avoid drift
-            diff = (p - 1771329660) % (mp * 86400)
-            phase = diff / (mp * 86400) # 0.0 to 1.0
-            
-            if phase < 0.0625 or phase >= 0.9375: return "🌑" # New
-            elif phase < 0.1875: return "🌒" # Waxing Crescent
-            elif phase < 0.3125: return "🌓" # First Quarter
-            elif phase < 0.4375: return "🌔" # Waxing Gibbous
-            elif phase < 0.5625: return "🌕" # Full
-            elif phase < 0.6875: return "🌖" # Waning Gibbous
-            elif phase < 0.8125: return "🌗" # Last Quarter
-            return "🌘" # Waning Crescent
-
-        if is_day == 0 and code in [0, 1]:  # Clear/Mainly Clear at night
-             w['icon'] = get_moon_phase_icon()
-        else:
-             w['icon'] = code_to_icon(code)
-
-        # Daily
-        if 'daily' in api:
-            d = api['daily']
-            w['max_temp_c'] = str(round(d['temperature_2m_max'][0]))
-            w['min_temp_c'] = str(round(d['temperature_2m_min'][0]))
-            w['uv_index'] = str(round(d['uv_index_max'][0]))
-            w['prob_rain'] = str(round(d['precipitation_probability_max'][0]))
-
-        # Feels like + humidity from hourly
-        current_hour = datetime.now().hour
-        if 'hourly' in api:
-            h = api['hourly']
-            if 'apparent_temperature' in h and current_hour < len(h['apparent_temperature']):
-                w['feels_like_c'] = str(round(h['apparent_temperature'][current_hour]))
-            if 'relative_humidity_2m' in h and current_hour < len(h['relative_humidity_2m']):
-                w['humidity'] = str(round(h['relative_humidity_2m'][current_hour]))
-
-            # Hourly forecast (next 3 time slots)
-            hourly_temps = h.get('temperature_2m', [])
-            hourly_codes = h.get('weather_code', [])
-            hourly_times = h.get('time', [])
-            forecast = []
-            for offset in [3, 6, 9]:
-                idx = current_hour + offset
-                if idx < len(hourly_temps) and idx < len(hourly_codes):
-                    t = datetime.fromisoformat(hourly_times[idx])
-                    forecast.append({
-                        "time": t.strftime("%-I%p"),
-                        "icon": code_to_icon(hourly_codes[idx]),
-                        "temp": str(round(hourly_temps[idx]))
-                    })
-            if forecast:
-                w['hourly_forecast'] = forecast # type: ignore
-
-    except Exception as e:
-        print(f"Weather update failed: {e}")
-
-    # --- NEWS UPDATE (DISABLED STALE API) ---
-    try:
-        print("Skipping stale news API. Using manual/cached news.")
-        # news_api_url = "https://actually-relevant-api.onrender.com/api/stories?issueSlug=artificial-intelligence"
-        # ... rest of news code commented or bypassed ...
-    except Exception as e:
-        print(f"News update failed: {e}")
+    # Instagram and news are preserved from the last snapshot (or default)
+    ig_data = ig_data or { "instagram": {} }
+    news_data = news_data or { "news": {} }
+
+    # Fetch the selected sources concurrently; each one succeeds or fails on its own
+    if not prev_weather.get('weather'):
+        sources = None if sources is None else set(sources) | {'weather'}
+    selected = {name: fn for name, fn in SOURCES.items() if sources is None or name in sources}
+    with span("fetch", sources=sorted(selected)) as attrs:
+        results = fetch_all(selected, deadlines=SOURCE_DEADLINES, fallbacks=SOURCE_FALLBACKS)
+        # Includes sources served by their fallback
+        attrs['failed'] = sorted(name for name, r in results.items() if r['error'])
+    for name, r in results.items():
+        count("fetch_retries", max(0, r['attempts'] - 1), source=name)
+        if r['error']:
+            count("fetch_failures", source=name)
+    if 'weather' in results and results['weather']['ok']:
+        count("weather_cache", source="weather", state=results['weather']['data']['cache']['cache'])
+    last_results.clear()
+    last_results.update(results)
+    weather_fetched_at = None
+
+    weather = results.get('weather')
+    if weather is None:
+        # Not due this cycle: keep the last weather card as is
+        weather_data = prev_weather
+    else:
+        try:
+            if not weather['ok']:
+                raise RuntimeError(weather['error'])
+            with span("transform", source="weather"):
+                build_weather(w, weather['data']['api'], datetime.now())
+            # Kept for retarget_bundle(): frames built ahead of time re-read it for their slot
+            store.set("forecast", weather['data']['api'])
+            cache = weather['data']['cache']
+            weather_fetched_at = cache['fetched_at']
+            if cache['stale']:
+                # API unreachable: last good forecast, flagged so the card can say so
+                w['stale'] = True
+                w['stale_since'] = datetime.fromtimestamp(cache['fetched_at']).strftime("%H:%M")
+        except Exception as e:
+            print(f"Weather update failed: {e}")
+            # Keep the last weather card instead of publishing an empty one
+            if prev_weather.get('weather'):
+                weather_data = prev_weather
+    if weather_data is prev_weather and 'weather_code' in prev_weather.get('weather', {}):
+        # Kept card: day/night, background and moon still follow the clock
+        apply_sky(prev_weather['weather'], prev_weather['weather']['weather_code'], datetime.now())
+
+    # --- NEWS / INSTAGRAM UPDATE (None means "keep cached") ---
+    for name, target, key in (('news', news_data, 'news'), ('instagram', ig_data, 'instagram')):
+        r = results.get(name)
+        if r is None:
+            continue
+        if not r['ok']:
+            print(f"{name.capitalize()} update failed: {r['error']}")
+        elif r['data'] is not None:
+            target[key] = r['data']
 
     # --- MOLTBOT UPDATE (Dummy Data) ---
     moltbot_data: Dict[str, Any] = {
@@ -267,94 +364,181 @@ def update_data():
     data['maxx_status']['last_update_time'] = now.strftime("%H:%M")
     data['maxx_status']['frame_id'] = now.strftime("%y%m%d%H%M")
 
-    # Save
     # Remove weather from main data if exists for cleanup
     if 'weather' in data:
         del data['weather']
 
-    with open(WEATHER_FILE, 'w') as f:
-        json.dump(weather_data, f, indent=2)
-
-    # Save Instagram Data
-    with open(INSTAGRAM_FILE, 'w') as f:
-        json.dump(ig_data, f, indent=2)
-
-    # Save News Data
-    with open(NEWS_FILE, 'w') as f:
-        json.dump(news_data, f, indent=2)
-
-    # Save Moltbot Data
-    with open(MOLTBOT_FILE, 'w') as f:
-        json.dump(moltbot_data, f, indent=2)
-
-    # Save Main Data (Status, etc.)
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
-
+    bundle = (data, weather_data, ig_data, news_data, moltbot_data)
+    with span("images") as attrs:
+        try:
+            attrs.update(localize(bundle))
+        except Exception as e:
+            print(f"Image cache failed: {e}")
+    if write:
+        save_data(bundle)
+    return bundle
+
+def retarget_bundle(bundle, at):
+    # Copy of bundle as update_data() would have built it at `at` from the same
+    # data: frame id, date and clock fields, and the weather card re-derived
+    # from the last forecast (current hour, hourly slots, day/night, moon).
+    data, weather_data, ig_data, news_data, moltbot_data = copy.deepcopy(bundle)
+    status = data.setdefault('maxx_status', {})
+    status['date'] = at.strftime("%A, %d %b").capitalize()
+    status['last_update_time'] = at.strftime("%H:%M")
+    status['frame_id'] = at.strftime("%y%m%d%H%M")
+    moltbot_data.get('moltbot', {}).get('operations', {})['last_post_timestamp'] = at.strftime("%H:%M")
+
+    w = weather_data.get('weather', {})
+    api = get_store(STATE_DB).get("forecast")
+    if api and 'weather_code' in w:
+        try:
+            kept = {k: w[k] for k in ('last_updated', 'stale', 'stale_since') if k in w}
+            weather_data['weather'] = build_weather(kept, api, at)
+        except Exception as e:
+            print(f"Weather retarget failed: {e}")
+            apply_sky(w, w['weather_code'], at)
+    elif 'weather_code' in w:
+        apply_sky(w, w['weather_code'], at)
     return data, weather_data, ig_data, news_data, moltbot_data
 
-def generate_and_upload():
+def save_data(bundle):
+    # State store first (snapshot + history), then the published bundle.
+    # The five legacy files are only written behind LEGACY_FILES.
+    with span("write", legacy=LEGACY_FILES):
+        store = get_store(STATE_DB)
+        record_weather = weather_fetched_at is not None and weather_fetched_at != store.get("weather_recorded_at")
+        store.put_snapshot(bundle, record_weather=record_weather)
+        if record_weather:
+            store.set("weather_recorded_at", weather_fetched_at)
+        write_bundle(bundle, BUNDLE_FILE, legacy=LEGACY_FILES, project_dir=PROJECT_DIR)
+
+DATA_BRANCH = DataBranch(PROJECT_DIR)
+
+def sync_github():
+    # Commits only when a published file changed, on the data branch (see scripts/data_branch.py)
+    with span("publish", branch=DATA_BRANCH.branch) as attrs:
+        print("Syncing data to GitHub Pages...")
+        paths = PUBLISHED_FILES + ([filename for _, filename in SECTIONS] if LEGACY_FILES else [])
+        result = DATA_BRANCH.publish(paths)
+        attrs.update(changed=result['changed'], squashed=result['squashed'], pushed=result['pushed'])
+        if result['commit'] is None:
+            print("Nothing new to publish.")
+        else:
+            print(f"Published {result['changed']} changed file(s) as {result['commit'][:12]}"
+                  f"{' (history squashed)' if result['squashed'] else ''}.")
+
+# Coalescing background publisher for sync_github(): at most one commit per PUBLISH_INTERVAL
+PUBLISHER = Publisher(sync_github, name="github-publish", min_interval=PUBLISH_INTERVAL)
+
+def capture_frames(bundle=None):
+    # Renders (or captures) the frame and encodes it once per device profile.
+    # Returns (frames, devices) for upload_frames(); bundle=None screenshots index.html.
+    CAPTURE_JS = os.path.join(PROJECT_DIR, "scripts", "capture_local.js")
+
+    with span("capture", mode=RENDER_MODE if bundle is not None else "browser"):
+        if RENDER_MODE == "native" and bundle is not None:
+            # 1. Render the frame in-process straight from the update_data() dicts
+            from render import last_render, render_frame
+            print("Rendering frame natively...")
+            start = time.time()
+            source = render_frame(*bundle)
+            dirty = ", ".join(last_render.get("dirty", [])) or "none"
+            print(f"Rendered in {(time.time() - start) * 1000:.0f} ms (re-drawn panels: {dirty})")
+        elif RENDER_MODE == "worker" and bundle is not None:
+            # 1. Hand the bundle to the warm browser page; PNG bytes come straight back
+            from capture_client import get_worker
+            print("Capturing frame with the capture worker...")
+            start = time.time()
+            source = get_worker(ensure_server()).capture(make_bundle(bundle))
+            print(f"Captured in {(time.time() - start) * 1000:.0f} ms")
+        else:
+            # 1. Screenshot the local render origin: a baked snapshot of this
+            # bundle (no fetches in the page), or index.html when called without one
+            url = ensure_server()
+            if bundle is not None:
+                url += os.path.basename(bake_snapshot(bundle))
+            print(f"Capturing screenshot from {url}...")
+            source = subprocess.check_output(['node', CAPTURE_JS, url, '-'])
+
+    # 4. Encode once per device profile (resolution, formats, byte budget)
+    devices = load_devices()
+    return encode_for(source, devices), devices
+
+def upload_frames(frames, devices):
+    # Archives the frame and delivers it to every device; raises if none accepted it
+    frame = frames[profile_key(devices[0])]
+    gauge("frame_bytes", frame['size'])
+    if WRITE_LATEST:
+        with open(os.path.join(PROJECT_DIR, f"Dashboard_Latest.{frame['ext']}"), 'wb') as f:
+            f.write(frame['data'])
+    if ARCHIVE_FRAMES:
+        try:
+            with span("archive"):
+                stored = archive_frame(frame['data'], frame['ext'])
+                pruned = prune()
+            print(f"Archived frame {stored['digest'][:12]} ({'new' if stored['new'] else 'dedup'}), "
+                  f"pruned {pruned['rows']} index rows / {pruned['objects']} objects")
+        except OSError as e:
+            print(f"Frame archive failed: {e}")
+
+    # 5. Upload to every frame in parallel; each device succeeds or fails on its own
+    print(f"Delivering to {len(devices)} frame(s)...")
+    results = deliver_all(frames, devices)
+    delivered = [name for name, r in results.items() if r['ok']]
+    if not delivered:
+        raise RuntimeError("no frame accepted the upload")
+    print(f"FTP Sync Complete ({len(delivered)}/{len(devices)} frames).")
+
+def generate_and_upload(bundle=None):
     print(f"[{datetime.now()}] Starting strict FTP upload...")
-    
-    # Paths
-    LATEST_PNG = os.path.join(PROJECT_DIR, "Dashboard_Latest.png")
-    LATEST_COPY_PNG = os.path.join(PROJECT_DIR, "Dashboard_Latest_Copy.png")
-    CAPTURE_JS = os.path.join(PROJECT_DIR, "scripts", "capture.js")
-
     try:
-        # 1. Update data files locally
-        # 2. Push to GitHub to update the master source (GitHub Pages)
-        print("Syncing data to GitHub Pages...")
-        subprocess.check_call(['git', '-C', PROJECT_DIR, 'add', '.'])
-        subprocess.check_call(['git', '-C', PROJECT_DIR, 'commit', '-m', f"Update Dashboard Data {datetime.now().strftime('%H:%M')}"])
-        subprocess.check_call(['git', '-C', PROJECT_DIR, 'push'])
-        
-        # Wait a bit for GitHub Pages to deploy
-        print("Waiting for deployment...")
-        time.sleep(15)
-
-        # 3. Generate screenshot using capture.js from URL
-        print("Capturing screenshot from GitHub Pages...")
-        subprocess.check_call(['node', CAPTURE_JS])
-
-        # Create copy for double-frame systems
-        subprocess.check_call(['cp', LATEST_PNG, LATEST_COPY_PNG])
-
-        # NEW WORKFLOW: Rename existing to "old_" first
-        print("Renaming existing frames to old_*...")
-        # We list files, then rename each that starts with Dashboard_
-        subprocess.call(['lftp', '-c', f'''
-            open ftp://{FTP_HOST}:{FTP_PORT};
-            ls Dashboard_* > /tmp/ftp_files.txt || exit 0
-        '''], shell=True)
-        
-        # Parse and rename
-        if os.path.exists("/tmp/ftp_files.txt"):
-            with open("/tmp/ftp_files.txt", "r") as f:
-                for line in f:
-                    parts = line.split()
-                    if parts:
-                        fname = parts[-1]
-                        if fname.startswith("Dashboard_"):
-                            print(f"Renaming {fname} to old_{fname}")
-                            subprocess.call(['lftp', '-c', f'open ftp://{FTP_HOST}:{FTP_PORT}; mv {fname} old_{fname}'])
-
-        print("Uploading new frames...")
-        # Upload actual filenames created by capture.js
-        subprocess.check_call(['curl', '-s', '-T', LATEST_PNG, f'ftp://{FTP_HOST}:{FTP_PORT}/{os.path.basename(LATEST_PNG)}'])
-        subprocess.check_call(['curl', '-s', '-T', LATEST_COPY_PNG, f'ftp://{FTP_HOST}:{FTP_PORT}/{os.path.basename(LATEST_COPY_PNG)}'])
-        
-        # FINAL STEP: Cleanup old frames
-        print("Cleaning up old frames...")
-        subprocess.call(['lftp', '-c', f'open ftp://{FTP_HOST}:{FTP_PORT}; mrm old_*'], stderr=subprocess.DEVNULL)
-        
-        print("FTP Sync Complete.")
-
+        upload_frames(*capture_frames(bundle))
     except Exception as e:
         print(f"FTP Sync failed: {e}")
+        count("deliveries_failed")
+        ok = False
+    else:
+        ok = True
+
+    # GitHub Pages is not on the frame's critical path; publish in the background
+    PUBLISHER.request()
+
+    return ok
+
+def run_cycle(sources=None):
+    try:
+        with span("cycle", sources=sorted(sources) if sources is not None else "all") as attrs:
+            bundle = update_data(write=False, sources=sources)
+            fp = fingerprint(bundle)
+            attrs['fingerprint'] = fp[:12]
+
+            if is_unchanged(fp):
+                count("cycles_skipped")
+                attrs['skipped'] = True
+                if SKIP_POLICY == "refresh":
+                    save_data(bundle)
+                    print("No visible changes since last frame. Refreshed local timestamps only.")
+                else:
+                    print("No visible changes since last frame. Skipping commit, capture and upload.")
+                return False
+
+            save_data(bundle)
+            attrs['delivered'] = generate_and_upload(bundle)
+            if attrs['delivered']:
+                mark_delivered(fp)
+            return attrs['delivered']
+    finally:
+        flush_metrics(get_store(STATE_DB))
 
 if __name__ == "__main__":
-    data = update_data()
-    generate_and_upload()
+    run_cycle()
+    close_device_sessions()
+    if RENDER_MODE == "worker":
+        from capture_client import close_worker
+        close_worker()
+    wait_for_revalidation()
+    PUBLISHER.wait()
+    flush_metrics(get_store(STATE_DB))
     print("Automation script complete.")
 